@@ -1,5 +1,61 @@
 from django.contrib import admin
-from .models import FurnitureType, Workshop, Worker, Order, OrderPhoto, OrderWorkJournal
+from django.contrib.admin.views.main import PAGE_VAR
+from . import cache, search
+from .models import (
+    Customer, FurnitureType, Workshop, Worker, Order, OrderPhoto, OrderWorkJournal,
+    PhotoBlob, WorkerLabor, WorkshopStats, normalize_phone
+)
+from .pagination import EstimatedCountPaginator
+
+# Пространства имен кэша, версия которых меняется вместе с вариантами фильтров.
+CHOICE_NAMESPACES = {
+    FurnitureType: cache.FURNITURE_TYPES,
+    Workshop: cache.WORKSHOPS,
+    Worker: cache.WORKSHOPS,
+}
+
+
+def _choices_key(model, field_path):
+    return f'admin_choices:{model._meta.label_lower}:{field_path}'
+
+
+class CachedRelatedFilter(admin.RelatedFieldListFilter):
+    """Фильтр по связанной модели с вариантами из кэша, а не из запроса."""
+
+    def field_choices(self, field, request, model_admin):
+        choices = super().field_choices
+        return cache.cached(
+            CHOICE_NAMESPACES[field.related_model],
+            _choices_key(field.model, field.name),
+            lambda: list(choices(field, request, model_admin))
+        )
+
+
+class CachedValuesFilter(admin.AllValuesFieldListFilter):
+    """Фильтр по значениям поля; DISTINCT по таблице выполняется раз в версию кэша."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        values = self.lookup_choices
+        self.lookup_choices = cache.cached(
+            CHOICE_NAMESPACES[model],
+            _choices_key(model, field_path),
+            lambda: list(values)
+        )
+
+
+class EstimatedCountMixin:
+    """Списки больших таблиц без полного подсчета записей на каждой странице."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            page_number=request.GET.get(PAGE_VAR)
+        )
 
 
 @admin.register(FurnitureType)
@@ -9,6 +65,20 @@ class FurnitureTypeAdmin(admin.ModelAdmin):
     list_filter = ('category', 'created_at')
 
 
+@admin.register(Customer)
+class CustomerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'phone', 'created_at')
+    search_fields = ('name',)
+    readonly_fields = ('phone_key',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Телефон ищется точным совпадением по уникальному индексу.
+        phone_key = normalize_phone(search_term)
+        if phone_key:
+            return queryset.filter(phone_key=phone_key), False
+        return super().get_search_results(request, queryset, search_term)
+
+
 @admin.register(Workshop)
 class WorkshopAdmin(admin.ModelAdmin):
     list_display = ('workshop_number', 'title', 'supervisor', 'created_at')
@@ -26,7 +96,10 @@ class WorkerInline(admin.TabularInline):
 class WorkerAdmin(admin.ModelAdmin):
     list_display = ('get_full_name', 'position', 'workshop', 'hire_date')
     search_fields = ('last_name', 'first_name', 'patronymic', 'position')
-    list_filter = ('workshop', 'hire_date', 'position')
+    list_filter = (
+        ('workshop', CachedRelatedFilter), 'hire_date', ('position', CachedValuesFilter)
+    )
+    list_select_related = ('workshop',)
     raw_id_fields = ('workshop',)
 
 
@@ -40,22 +113,80 @@ class OrderWorkJournalInline(admin.TabularInline):
     extra = 0
     raw_id_fields = ('workshop', 'workers')
 
+    def get_queryset(self, request):
+        # Подпись строки (__str__ записи) читает заказ и цех.
+        return super().get_queryset(request).select_related('order', 'workshop')
+
+
+class OverdueFilter(admin.SimpleListFilter):
+    title = 'Просрочен'
+    parameter_name = 'overdue'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('yes', 'Да'),
+            ('no', 'Нет'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.overdue()
+        if self.value() == 'no':
+            return queryset.not_overdue()
+        return queryset
+
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(EstimatedCountMixin, admin.ModelAdmin):
     list_display = ('title', 'customer_name', 'furniture_type', 'status', 'priority', 'deadline', 'is_overdue')
-    list_editable = ('status', 'priority')
+    # Статус меняется действиями: они проверяют допустимые переходы и не
+    # перезаписывают заказ целиком. Поля формы в каждой строке - самая
+    # дорогая часть отрисовки списка, поэтому их немного.
+    list_editable = ('priority',)
+    list_per_page = 50
     search_fields = ('title', 'description', 'customer_name')
-    list_filter = ('status', 'priority', 'furniture_type', 'deadline', 'created_at')
+    # date_hierarchy не используется: он строит ссылки запросом DISTINCT
+    # по всей таблице. Фильтр по дате дает те же периоды без запросов.
+    list_filter = (
+        OverdueFilter, 'status', 'priority', ('furniture_type', CachedRelatedFilter),
+        'deadline', 'created_at'
+    )
+    list_select_related = ('furniture_type',)
     raw_id_fields = ('furniture_type',)
-    filter_horizontal = ('workshops',)
-    date_hierarchy = 'deadline'
+    autocomplete_fields = ('workshops',)
     inlines = (OrderPhotoInline, OrderWorkJournalInline)
+    actions = ('complete_orders', 'cancel_orders')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overdue()
+
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields нужны только для поля поиска на странице: ищем
+        # по полнотекстовому индексу, без LIKE по каждому полю.
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_orders(queryset, search_term), False
     
     def is_overdue(self, obj):
-        return obj.is_overdue()
+        return obj.overdue
     is_overdue.boolean = True
     is_overdue.short_description = 'Просрочен'
+    is_overdue.admin_order_field = 'overdue'
+
+    def _transition(self, request, queryset, status, verb):
+        updated = queryset.transition(status)
+        self.message_user(
+            request,
+            f'{verb} заказов: {updated}. Заказы в других статусах не изменены.'
+        )
+
+    @admin.action(description='Завершить выбранные заказы', permissions=('change',))
+    def complete_orders(self, request, queryset):
+        self._transition(request, queryset, 'completed', 'Завершено')
+
+    @admin.action(description='Отменить выбранные заказы', permissions=('change',))
+    def cancel_orders(self, request, queryset):
+        self._transition(request, queryset, 'cancelled', 'Отменено')
 
 
 @admin.register(OrderPhoto)
@@ -66,12 +197,54 @@ class OrderPhotoAdmin(admin.ModelAdmin):
     raw_id_fields = ('order',)
 
 
+@admin.register(PhotoBlob)
+class PhotoBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'ref_count')
+    search_fields = ('=name',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(OrderWorkJournal)
-class OrderWorkJournalAdmin(admin.ModelAdmin):
-    list_display = ('order', 'workshop', 'start_time', 'end_time')
+class OrderWorkJournalAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ('order', 'workshop', 'start_time', 'end_time', 'duration', 'labor')
     search_fields = ('order__title', 'work_description')
-    list_filter = ('workshop', 'start_time', 'end_time')
+    list_filter = (('workshop', CachedRelatedFilter), 'start_time', 'end_time')
+    list_select_related = ('order', 'workshop')
     raw_id_fields = ('order', 'workshop')
-    filter_horizontal = ('workers',)
-    date_hierarchy = 'start_time'
+    autocomplete_fields = ('workers',)
+
 
+@admin.register(WorkerLabor)
+class WorkerLaborAdmin(admin.ModelAdmin):
+    list_display = ('worker', 'work_date', 'duration', 'entries')
+    list_select_related = ('worker',)
+    date_hierarchy = 'work_date'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WorkshopStats)
+class WorkshopStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'workshop', 'worker_count', 'busy_workers', 'active_orders',
+        'active_urgent', 'open_journal_entries', 'updated_at'
+    )
+    list_select_related = ('workshop',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
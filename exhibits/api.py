@@ -0,0 +1,430 @@
+"""
+JSON API только для чтения: заказы, цеха, рабочие и записи журнала.
+
+Табло и планшеты опрашивают данные постоянно, а меняются они редко.
+Поэтому ответ сначала строится из одних ключей и времени изменения
+строк (updated_at): из них получается ETag, и если клиент прислал его
+в If-None-Match, ответ 304 отдается после одного легкого запроса.
+Сами поля читаются только при изменениях.
+
+Параметры списков:
+    ?fields=id,title,status  - какие поля вернуть (id возвращается всегда);
+    ?after=..., ?before=...  - курсоры соседних страниц из next/previous;
+    ?limit=50                - записей на странице, не больше MAX_LIMIT;
+    фильтры ресурса, например ?status=new&workshop=3.
+
+Last-Modified отдается только для отдельных записей: из списка строку
+могут удалить, не изменив времени изменения остальных.
+
+Планшеты вместо опроса списков забирают изменения через /api/sync/
+(см. sync()).
+
+API доступен только после входа в систему, как и страницы заказов:
+в ответах есть имена и телефоны заказчиков.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .models import ChangeSequence, Order, OrderWorkJournal, Tombstone, Worker, Workshop
+from .pagination import KeysetPaginator
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+SYNC_LIMIT = 500
+SYNC_MAX_LIMIT = 2000
+
+
+class Resource:
+    """
+    Описание модели в API: поля для values(), поля многие-ко-многим
+    в виде (промежуточная модель, поле этой модели, поле связанной),
+    поля по умолчанию, сортировка списка и фильтры {параметр: lookup}.
+    """
+
+    def __init__(self, name, model, fields, default_fields, ordering,
+                 many=None, filters=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.many = many or {}
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.filters = filters or {}
+
+    def parse_fields(self, value):
+        """Запрошенные поля; ValueError для неизвестных."""
+        if not value:
+            return list(self.default_fields)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [
+            name for name in names
+            if name != 'id' and name not in self.fields and name not in self.many
+        ]
+        if unknown:
+            raise ValueError(
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: id, {", ".join([*self.fields, *self.many])}.'
+            )
+        return [name for name in dict.fromkeys(names) if name != 'id']
+
+    def filter(self, params):
+        queryset = self.model._default_manager.all()
+        for param, lookup in self.filters.items():
+            if param not in params:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: params[param]})
+            except (ValueError, ValidationError):
+                raise ValueError(f'Неверное значение параметра {param}.') from None
+        return queryset
+
+    def rows(self, pks, fields):
+        """Строки с полями fields в порядке pks: один запрос на таблицу."""
+        columns = [name for name in fields if name in self.fields]
+        rows = {
+            row['id']: row
+            for row in self.model._default_manager.filter(pk__in=pks).values('id', *columns)
+        }
+        self.add_many(rows, fields)
+        return [rows[pk] for pk in pks if pk in rows]
+
+    def add_many(self, rows, fields):
+        """Добавляет строкам {pk: строка} ключи связей многие-ко-многим."""
+        for name in fields:
+            if name not in self.many:
+                continue
+            through, source, target = self.many[name]
+            for row in rows.values():
+                row[name] = []
+            links = through.objects.filter(
+                **{f'{source}__in': list(rows)}
+            ).order_by(source, target).values_list(source, target)
+            for pk, related_pk in links:
+                rows[pk][name].append(related_pk)
+
+
+ORDERS = Resource(
+    'orders',
+    Order,
+    fields=(
+        'title', 'description', 'customer_name', 'customer_phone', 'customer',
+        'furniture_type', 'status', 'priority', 'deadline', 'completion_date',
+        'total_cost', 'notes', 'workshop_count', 'last_journal_at',
+        'created_at', 'updated_at',
+    ),
+    many={'workshops': (Order.workshops.through, 'order_id', 'workshop_id')},
+    default_fields=(
+        'title', 'furniture_type', 'status', 'priority', 'deadline', 'updated_at',
+    ),
+    ordering=('-id',),
+    filters={
+        'status': 'status',
+        'priority': 'priority',
+        'furniture_type': 'furniture_type',
+        'customer': 'customer',
+        'workshop': 'workshops',
+    },
+)
+
+WORKSHOPS = Resource(
+    'workshops',
+    Workshop,
+    fields=(
+        'title', 'description', 'workshop_number', 'supervisor',
+        'created_at', 'updated_at',
+    ),
+    default_fields=('title', 'workshop_number', 'supervisor', 'updated_at'),
+    ordering=('workshop_number', 'id'),
+)
+
+WORKERS = Resource(
+    'workers',
+    Worker,
+    fields=(
+        'first_name', 'last_name', 'patronymic', 'position', 'workshop',
+        'hire_date', 'updated_at',
+    ),
+    default_fields=(
+        'first_name', 'last_name', 'patronymic', 'position', 'workshop', 'updated_at',
+    ),
+    ordering=('id',),
+    filters={'workshop': 'workshop'},
+)
+
+JOURNAL = Resource(
+    'journal',
+    OrderWorkJournal,
+    fields=(
+        'order', 'workshop', 'start_time', 'end_time', 'work_description',
+        'work_date', 'duration', 'labor', 'updated_at',
+    ),
+    many={'workers': (OrderWorkJournal.workers.through, 'orderworkjournal_id', 'worker_id')},
+    default_fields=('order', 'workshop', 'start_time', 'end_time', 'workers', 'updated_at'),
+    ordering=('-id',),
+    filters={'order': 'order', 'workshop': 'workshop', 'worker': 'workers'},
+)
+
+
+def make_etag(*parts):
+    data = json.dumps(parts, cls=DjangoJSONEncoder).encode()
+    return '"%s"' % hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def json_response(data, status=200):
+    # Кириллица без \u-последовательностей: ответ вдвое короче.
+    return JsonResponse(
+        data, status=status, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error_response(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+def finish(response, etag, last_modified=None):
+    """Заголовки проверки актуальности; клиент проверяет их при каждом запросе."""
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """Ответ 304 или None, если у клиента устаревшие данные."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is not None:
+        return finish(response, etag, last_modified)
+    return None
+
+
+def api_login_required(view):
+    """
+    Как login_required, но без перенаправления на страницу входа:
+    клиенту API нужен ответ в JSON.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response('Требуется вход в систему.', status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    if value is None:
+        return default
+    message = f'limit должен быть числом от 1 до {maximum}.'
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(message) from None
+    if not 1 <= limit <= maximum:
+        raise ValueError(message)
+    return limit
+
+
+def resource_list(request, resource):
+    try:
+        fields = resource.parse_fields(request.GET.get('fields'))
+        limit = parse_limit(request.GET.get('limit'))
+        queryset = resource.filter(request.GET)
+    except ValueError as error:
+        return error_response(str(error))
+
+    keys = [name.lstrip('-') for name in resource.ordering]
+    paginator = KeysetPaginator(
+        queryset.only(*keys, 'updated_at'), limit, ordering=resource.ordering, count=False
+    )
+    page = paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+    versions = [(obj.pk, obj.updated_at) for obj in page]
+    etag = make_etag(
+        resource.name, fields, versions, page.next_cursor, page.previous_cursor
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    data = {
+        'results': resource.rows([pk for pk, _ in versions], fields),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+    return finish(json_response(data), etag)
+
+
+def resource_detail(request, resource, pk):
+    try:
+        fields = resource.parse_fields(request.GET.get('fields'))
+    except ValueError as error:
+        return error_response(str(error))
+
+    updated_at = resource.model._default_manager.filter(pk=pk).values_list(
+        'updated_at', flat=True
+    ).first()
+    if updated_at is None:
+        return error_response('Запись не найдена.', status=404)
+    etag = make_etag(resource.name, fields, pk, updated_at)
+    response = not_modified(request, etag, updated_at)
+    if response is not None:
+        return response
+
+    rows = resource.rows([pk], fields)
+    if not rows:
+        return error_response('Запись не найдена.', status=404)
+    return finish(json_response(rows[0]), etag, updated_at)
+
+
+@api_login_required
+@require_safe
+def order_list(request):
+    return resource_list(request, ORDERS)
+
+
+@api_login_required
+@require_safe
+def order_detail(request, order_id):
+    return resource_detail(request, ORDERS, order_id)
+
+
+@api_login_required
+@require_safe
+def workshop_list(request):
+    return resource_list(request, WORKSHOPS)
+
+
+@api_login_required
+@require_safe
+def workshop_detail(request, workshop_id):
+    return resource_detail(request, WORKSHOPS, workshop_id)
+
+
+@api_login_required
+@require_safe
+def worker_list(request):
+    return resource_list(request, WORKERS)
+
+
+@api_login_required
+@require_safe
+def worker_detail(request, worker_id):
+    return resource_detail(request, WORKERS, worker_id)
+
+
+@api_login_required
+@require_safe
+def journal_list(request):
+    return resource_list(request, JOURNAL)
+
+
+@api_login_required
+@require_safe
+def journal_detail(request, journal_id):
+    return resource_detail(request, JOURNAL, journal_id)
+
+
+SYNC_RESOURCES = (WORKSHOPS, WORKERS, ORDERS, JOURNAL)
+
+
+def parse_since(value):
+    try:
+        since = int(value or 0)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise ValueError('since должен быть неотрицательным целым числом.')
+    return since
+
+
+@api_login_required
+@require_safe
+def sync(request):
+    """
+    Изменения цехов, рабочих, заказов и журнала после отметки ?since=N.
+
+    Каждая запись при сохранении получает новый номер изменения
+    (change_seq), удаление оставляет Tombstone с таким же номером.
+    Ответ содержит строки с номерами в (since, until] и ключи удаленных
+    записей; клиент применяет сначала changes, затем deleted и передает
+    until в следующем запросе. При more = true изменений больше limit
+    и стоит сразу запросить следующую порцию.
+
+    Номер изменения выдается в транзакции записи, поэтому номера до
+    текущего значения счетчика уже зафиксированы: запросы ограничены
+    им и видят согласованный набор без общей транзакции. Пустой опрос
+    стоит одного запроса к счетчику, непустой - одного запроса по
+    индексу change_seq на таблицу (и одного на связи многие-ко-многим).
+    """
+    try:
+        since = parse_since(request.GET.get('since'))
+        limit = parse_limit(request.GET.get('limit'), SYNC_LIMIT, SYNC_MAX_LIMIT)
+    except ValueError as error:
+        return error_response(str(error))
+
+    sequence, _ = ChangeSequence.objects.get_or_create(pk=1)
+    head = sequence.value
+    if since > head or 0 < since < sequence.horizon:
+        return error_response(
+            'Отметка устарела или неизвестна: загрузите данные заново с since=0.',
+            status=410
+        )
+    data = {
+        'since': since,
+        'until': head,
+        'more': False,
+        'changes': {resource.name: [] for resource in SYNC_RESOURCES},
+        'deleted': {resource.name: [] for resource in SYNC_RESOURCES},
+    }
+    if since == head:
+        return json_response(data)
+
+    sources = {
+        resource.name: resource.model._default_manager.filter(
+            change_seq__gt=since, change_seq__lte=head
+        ).order_by('change_seq', 'id').values('id', 'change_seq', *resource.fields)
+        for resource in SYNC_RESOURCES
+    }
+    sources[None] = Tombstone.objects.filter(
+        change_seq__gt=since, change_seq__lte=head
+    ).order_by('change_seq', 'id').values('model', 'object_id', 'change_seq')
+    fetched = {key: list(queryset[:limit + 1]) for key, queryset in sources.items()}
+
+    numbers = sorted(row['change_seq'] for rows in fetched.values() for row in rows)
+    if len(numbers) > limit or any(len(rows) > limit for rows in fetched.values()):
+        until = numbers[limit - 1]
+        for key, rows in fetched.items():
+            if len(rows) > limit and rows[-1]['change_seq'] <= until:
+                # Одно изменение затронуло больше limit строк таблицы:
+                # порцию нельзя разрезать посередине, берем его целиком.
+                rows = list(sources[key].filter(change_seq__lte=until))
+            fetched[key] = [row for row in rows if row['change_seq'] <= until]
+        data['until'] = until
+        data['more'] = True
+
+    resources = {resource.model._meta.model_name: resource for resource in SYNC_RESOURCES}
+    for row in fetched.pop(None):
+        data['deleted'][resources[row['model']].name].append(row['object_id'])
+    for resource in SYNC_RESOURCES:
+        rows = {}
+        for row in fetched[resource.name]:
+            del row['change_seq']
+            rows[row['id']] = row
+        resource.add_many(rows, resource.many)
+        data['changes'][resource.name] = list(rows.values())
+    return json_response(data)
@@ -6,3 +6,5 @@ class ExhibitsConfig(AppConfig):
     name = 'exhibits'
     verbose_name = 'Экспонаты'
 
+    def ready(self):
+        from . import signals  # noqa: F401
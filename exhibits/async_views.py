@@ -0,0 +1,133 @@
+"""
+Асинхронные версии представлений только для чтения.
+
+Под ASGI-сервером синхронное представление занимает поток на все время
+запроса, а асинхронное отдает управление циклу событий, пока ждет базу.
+Включаются настройкой EXHIBITS_ASYNC_VIEWS.
+
+Все данные загружаются асинхронным ORM до отрисовки шаблона: запрос
+к базе из шаблона в асинхронном коде вызывает SynchronousOnlyOperation.
+Поэтому наборы записей материализуются заранее, а пользователь
+загружается через request.auser().
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Count
+from django.shortcuts import aget_object_or_404, render
+
+from . import cache
+from .models import FurnitureType, Order, Workshop
+from .pagination import KeysetPaginator
+from .views import get_active_orders, get_journal_form_context
+
+
+async def render_async(request, template_name, context):
+    # Контекстный процессор auth читает request.user, синхронная
+    # загрузка которого здесь запрещена.
+    request.user = await request.auser()
+    return render(request, template_name, context)
+
+
+async def get_order_page(request, order_list):
+    """Страница заказов по курсору из параметров after/before."""
+    paginator = KeysetPaginator(order_list, 10, count=False)
+    return await paginator.aget_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+
+
+async def index(request):
+    """Главная страница со списком заказов."""
+    page_obj = await get_order_page(request, get_active_orders())
+    context = {
+        'page_obj': page_obj,
+    }
+    return await render_async(request, 'exhibits/index.html', context)
+
+
+async def order_detail(request, order_id):
+    """Страница детального просмотра заказа."""
+    order = await aget_object_or_404(
+        Order.objects.select_related('furniture_type').prefetch_related('workshops', 'photos'),
+        pk=order_id
+    )
+    work_journal = [
+        entry async for entry in
+        order.work_journal.select_related('workshop').prefetch_related('workers')
+    ]
+    context = {
+        'order': order,
+        'work_journal': work_journal,
+        'form': None,
+        'journal_to_edit': None,
+        'journal_to_delete': None,
+    }
+    request.user = await request.auser()
+    if not request.user.is_authenticated:
+        return render(request, 'exhibits/order_detail.html', context)
+
+    # Форма журнала читает цеха и рабочих при отрисовке, поэтому
+    # страница с ней собирается и рисуется в потоке.
+    def render_with_form():
+        context.update(get_journal_form_context(request, order))
+        return render(request, 'exhibits/order_detail.html', context)
+
+    return await sync_to_async(render_with_form)()
+
+
+async def furniture_type_list(request):
+    """Список типов мебели."""
+    async def build():
+        return [
+            furniture_type async for furniture_type in
+            FurnitureType.objects.annotate(order_count=Count('orders'))
+        ]
+
+    context = {
+        'furniture_types': await cache.acached(cache.FURNITURE_TYPES, 'list', build),
+    }
+    return await render_async(request, 'exhibits/furniture_type_list.html', context)
+
+
+async def furniture_type_detail(request, furniture_type_id):
+    """Детальная страница типа мебели."""
+    furniture_type = await aget_object_or_404(FurnitureType, pk=furniture_type_id)
+    order_list = get_active_orders().filter(
+        furniture_type=furniture_type
+    )
+    context = {
+        'furniture_type': furniture_type,
+        'page_obj': await get_order_page(request, order_list),
+    }
+    return await render_async(request, 'exhibits/furniture_type_detail.html', context)
+
+
+async def workshop_list(request):
+    """Список цехов."""
+    async def build():
+        return [
+            workshop async for workshop in
+            Workshop.objects.select_related('supervisor', 'stats')
+        ]
+
+    context = {
+        'workshops': await cache.acached(cache.WORKSHOPS, 'list', build),
+    }
+    return await render_async(request, 'exhibits/workshop_list.html', context)
+
+
+async def workshop_detail(request, workshop_id):
+    """Детальная страница цеха."""
+    workshop = await aget_object_or_404(
+        Workshop.objects.select_related('supervisor', 'stats'),
+        pk=workshop_id
+    )
+    context = {
+        'workshop': workshop,
+        'workers': [worker async for worker in workshop.workers.all()],
+        'orders': [
+            order async for order in
+            workshop.orders.filter(status='in_progress').select_related('furniture_type')
+        ],
+    }
+    return await render_async(request, 'exhibits/workshop_detail.html', context)
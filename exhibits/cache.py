@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+WORKSHOPS = 'workshops'
+FURNITURE_TYPES = 'furniture_types'
+
+# Отличает отсутствие ключа от закэшированного None.
+MISSING = object()
+
+
+def _version_key(namespace):
+    return f'exhibits:{namespace}:version'
+
+
+def _new_version():
+    # Версия уникальна во времени: если ключ версии вытеснен из кэша,
+    # новая версия не совпадет с версиями старых записей.
+    return time.time_ns()
+
+
+def get_version(namespace):
+    """Текущая версия данных пространства имен."""
+    return cache.get_or_set(_version_key(namespace), _new_version, None)
+
+
+async def aget_version(namespace):
+    return await cache.aget_or_set(_version_key(namespace), _new_version, None)
+
+
+def bump_version(*namespaces):
+    """
+    Делает устаревшими все закэшированные данные пространств имен.
+    Версия меняется после фиксации транзакции, чтобы параллельный
+    запрос не закэшировал под новой версией еще не записанные данные.
+    """
+    def bump():
+        for namespace in namespaces:
+            try:
+                cache.incr(_version_key(namespace))
+            except ValueError:
+                cache.set(_version_key(namespace), _new_version(), None)
+    transaction.on_commit(bump)
+
+
+def cached(namespace, name, builder):
+    """Возвращает значение из кэша или вычисляет и сохраняет его."""
+    key = f'exhibits:{namespace}:{get_version(namespace)}:{name}'
+    return cache.get_or_set(key, builder, settings.EXHIBITS_CACHE_TIMEOUT)
+
+
+async def acached(namespace, name, builder):
+    """
+    Асинхронная версия cached(); builder - корутинная функция.
+    aget_or_set() не подходит: значение по умолчанию он вычисляет
+    синхронно, а запросы к базе из асинхронного кода запрещены.
+    """
+    key = f'exhibits:{namespace}:{await aget_version(namespace)}:{name}'
+    value = await cache.aget(key, MISSING)
+    if value is MISSING:
+        value = await builder()
+        await cache.aset(key, value, settings.EXHIBITS_CACHE_TIMEOUT)
+    return value
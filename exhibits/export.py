@@ -0,0 +1,139 @@
+"""
+Потоковая выгрузка заказов и журнала работ в CSV.
+
+Строки читаются через values_list().iterator() пачками по CHUNK_SIZE,
+связанные цеха и рабочие подгружаются одним запросом на пачку, а готовый
+текст сразу отдается клиенту. Поэтому выгрузка любого объема идет в
+постоянной памяти, и первые байты уходят до окончания чтения базы.
+"""
+import csv
+import io
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Order, OrderWorkJournal
+
+CHUNK_SIZE = 2000
+
+ORDER_HEADER = (
+    'Номер', 'Дата создания', 'Название', 'Заказчик', 'Телефон',
+    'Тип мебели', 'Цеха', 'Статус', 'Приоритет', 'Срок выполнения',
+    'Дата выполнения', 'Стоимость',
+)
+JOURNAL_HEADER = (
+    'Запись', 'Номер заказа', 'Заказ', 'Цех', 'Начало работы',
+    'Окончание работы', 'Длительность, ч', 'Рабочие', 'Человеко-часы',
+    'Описание',
+)
+
+
+def _batches(rows, size=CHUNK_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _datetime(value, tz):
+    return value.astimezone(tz).strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def _hours(value):
+    return f'{value.total_seconds() / 3600:.2f}' if value is not None else ''
+
+
+def order_rows(queryset):
+    """Строки выгрузки заказов с типом мебели, цехами и стоимостью."""
+    tz = timezone.get_current_timezone()
+    statuses = dict(Order.STATUS_CHOICES)
+    priorities = dict(Order.PRIORITY_CHOICES)
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'created_at', 'title', 'customer_name', 'customer_phone',
+        'furniture_type__title', 'status', 'priority', 'deadline',
+        'completion_date', 'total_cost'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for batch in _batches(rows):
+        workshops = defaultdict(list)
+        links = Order.workshops.through.objects.filter(
+            order_id__in=[row[0] for row in batch]
+        ).order_by('workshop__workshop_number').values_list('order_id', 'workshop__title')
+        for order_id, title in links:
+            workshops[order_id].append(title)
+        for (pk, created_at, title, customer_name, customer_phone, furniture_type,
+             status, priority, deadline, completion_date, total_cost) in batch:
+            yield (
+                pk, _datetime(created_at, tz), title, customer_name, customer_phone,
+                furniture_type, ', '.join(workshops[pk]), statuses.get(status, status),
+                priorities.get(priority, priority), deadline, completion_date or '',
+                total_cost if total_cost is not None else '',
+            )
+
+
+def journal_rows(queryset):
+    """Строки выгрузки журнала с рабочими и длительностью."""
+    tz = timezone.get_current_timezone()
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'order_id', 'order__title', 'workshop__title', 'start_time',
+        'end_time', 'duration', 'labor', 'work_description'
+    ).iterator(chunk_size=CHUNK_SIZE)
+    for batch in _batches(rows):
+        workers = defaultdict(list)
+        links = OrderWorkJournal.workers.through.objects.filter(
+            orderworkjournal_id__in=[row[0] for row in batch]
+        ).order_by('worker__last_name').values_list(
+            'orderworkjournal_id', 'worker__last_name', 'worker__first_name'
+        )
+        for journal_id, last_name, first_name in links:
+            workers[journal_id].append(f'{last_name} {first_name}')
+        for (pk, order_id, order_title, workshop, start_time, end_time,
+             duration, labor, description) in batch:
+            yield (
+                pk, order_id, order_title, workshop, _datetime(start_time, tz),
+                _datetime(end_time, tz), _hours(duration), ', '.join(workers[pk]),
+                _hours(labor), description,
+            )
+
+
+def stream_csv(header, rows):
+    """
+    Текст CSV частями по CHUNK_SIZE строк. Разделитель - точка с запятой,
+    а в начале стоит BOM: так файл без настройки открывает Excel
+    с русской локалью.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    yield buffer.getvalue()
+    for batch in _batches(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def gzip_stream(chunks):
+    """
+    Сжимает поток текста в формат gzip, не накапливая его целиком.
+    Каждая часть сбрасывается сразу, чтобы клиент не ждал заполнения
+    буфера компрессора.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def csv_response(filename, header, rows, compress=False):
+    """Потоковый ответ с CSV-файлом, при compress - сжатым gzip."""
+    chunks = stream_csv(header, rows)
+    if compress:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,8 +1,51 @@
 from django import forms
+from django.urls import reverse_lazy
 from .models import Order, OrderWorkJournal, FurnitureType, Workshop, Worker
+from .reports import GROUP_CHOICES
 
 
-class OrderForm(forms.ModelForm):
+class VersionedModelForm(forms.ModelForm):
+    """
+    Форма правки с проверкой версии записи. Скрытое поле version хранит
+    версию на момент открытия формы; если запись успели изменить,
+    сохранение вызывает EditConflict, а не перезаписывает чужую правку.
+    """
+
+    conflict_message = (
+        'Запись изменили, пока вы ее редактировали. Проверьте данные: '
+        'повторное сохранение заменит чужие изменения вашими.'
+    )
+
+    version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            self.fields['version'].initial = self.instance.version
+
+    def save(self, commit=True):
+        if self.instance.pk is not None:
+            self.instance.expected_version = self.cleaned_data.get('version')
+        return super().save(commit)
+
+    def add_conflict_error(self):
+        """
+        Показывает ошибку и переносит в форму текущую версию, чтобы
+        пользователь мог сохранить свои данные осознанно. Запрос
+        выполняется только после конфликта. False, если запись удалена.
+        """
+        current = type(self.instance)._default_manager.filter(
+            pk=self.instance.pk
+        ).values_list('version', flat=True).first()
+        if current is None:
+            return False
+        self.data = self.data.copy()
+        self.data[self.add_prefix('version')] = current
+        self.add_error(None, self.conflict_message)
+        return True
+
+
+class OrderForm(VersionedModelForm):
     """Форма для создания и редактирования заказа."""
     
     class Meta:
@@ -27,20 +70,64 @@ class OrderForm(forms.ModelForm):
         }
 
 
-class OrderWorkJournalForm(forms.ModelForm):
+class WorkerPicker(forms.CheckboxSelectMultiple):
+    """
+    Флажки только для выбранных рабочих, а не для всех рабочих фабрики.
+    Остальных рабочих цеха подгружает скрипт worker_picker.js по мере
+    поиска (см. views.worker_choices).
+    """
+
+    class Media:
+        js = ('js/worker_picker.js',)
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if pk]
+        self.choices = [
+            (worker.pk, worker.get_full_name())
+            for worker in Worker.objects.filter(pk__in=selected).only(
+                'last_name', 'first_name', 'patronymic'
+            )
+        ] if selected else []
+        return super().optgroups(name, value, attrs)
+
+
+class OrderWorkJournalForm(VersionedModelForm):
     """Форма для создания и редактирования записи журнала работы."""
     
     class Meta:
         model = OrderWorkJournal
         fields = ('workshop', 'workers', 'start_time', 'end_time', 'work_description')
         widgets = {
-            'workshop': forms.Select(attrs={'class': 'form-control'}),
-            'workers': forms.CheckboxSelectMultiple(),
+            'workshop': forms.Select(attrs={
+                'class': 'form-control',
+                'data-workers-url': reverse_lazy('exhibits:worker_choices'),
+            }),
+            'workers': WorkerPicker(),
             'start_time': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'end_time': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'work_description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
+    def clean(self):
+        """
+        Рабочие должны быть из цеха записи. Проверка идет по рабочим,
+        уже загруженным полем одним запросом IN. Рабочих из других цехов,
+        выбранных в записи раньше, можно оставить.
+        """
+        cleaned_data = super().clean()
+        workshop = cleaned_data.get('workshop')
+        workers = cleaned_data.get('workers')
+        if workshop is None or not workers:
+            return cleaned_data
+        kept = {getattr(worker, 'pk', worker) for worker in self.initial.get('workers', ())}
+        strangers = [
+            worker.get_full_name() for worker in workers
+            if worker.workshop_id != workshop.pk and worker.pk not in kept
+        ]
+        if strangers:
+            self.add_error('workers', f'Рабочие не из цеха «{workshop}»: {", ".join(strangers)}.')
+        return cleaned_data
+
 
 class FurnitureTypeForm(forms.ModelForm):
     """Форма для создания и редактирования типа мебели."""
@@ -84,3 +171,94 @@ class WorkerForm(forms.ModelForm):
             'hire_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
 
+
+
+class LaborReportForm(forms.Form):
+    """Параметры отчета по трудозатратам."""
+    
+    group = forms.ChoiceField(
+        label='Группировка',
+        choices=GROUP_CHOICES,
+        initial='worker',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    date_from = forms.DateField(
+        label='С даты',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    date_to = forms.DateField(
+        label='По дату',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('Начальная дата позже конечной.')
+        return cleaned_data
+
+
+class ExportForm(forms.Form):
+    """Период и формат выгрузки в CSV."""
+    
+    date_from = forms.DateField(
+        label='С даты',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    date_to = forms.DateField(
+        label='По дату',
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    gzip = forms.BooleanField(
+        label='Сжать gzip',
+        required=False
+    )
+
+
+class OrderImportUploadForm(forms.Form):
+    """Загрузка CSV-файла с заказами."""
+    
+    file = forms.FileField(
+        label='CSV-файл',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+    dry_run = forms.BooleanField(
+        label='Только проверить, не сохраняя',
+        required=False
+    )
+
+
+class OrderStatusForm(forms.Form):
+    """Массовое завершение или отмена заказов начальником цеха."""
+
+    MAX_ORDERS = 500
+
+    status = forms.ChoiceField(
+        label='Статус',
+        choices=[
+            (value, label) for value, label in Order.STATUS_CHOICES
+            if value in ('completed', 'cancelled')
+        ]
+    )
+    orders = forms.Field(
+        label='Заказы',
+        widget=forms.MultipleHiddenInput,
+        error_messages={'required': 'Не выбрано ни одного заказа.'}
+    )
+
+    def clean_orders(self):
+        try:
+            order_ids = {int(pk) for pk in self.cleaned_data['orders']}
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Некорректные номера заказов.')
+        if len(order_ids) > self.MAX_ORDERS:
+            raise forms.ValidationError(
+                f'За один раз можно изменить не больше {self.MAX_ORDERS} заказов.'
+            )
+        return order_ids
@@ -0,0 +1,278 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import cache, reports, stats
+from .models import (
+    ChangeSequence, Customer, FurnitureType, Order, OrderWorkJournal, Worker, Workshop
+)
+
+User = get_user_model()
+
+FIRST_NAMES = (
+    'Александр', 'Алексей', 'Анна', 'Дмитрий', 'Елена', 'Иван', 'Ирина',
+    'Мария', 'Михаил', 'Наталья', 'Ольга', 'Сергей', 'Татьяна', 'Юлия',
+)
+LAST_NAMES = (
+    'Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов',
+    'Волков', 'Соколов', 'Новиков', 'Морозов', 'Козлов', 'Лебедев',
+)
+PATRONYMICS = ('Сергеевич', 'Иванович', 'Алексеевич', 'Дмитриевич', 'Петрович')
+POSITIONS = ('Столяр', 'Сборщик мебели', 'Обивщик', 'Швея', 'Отделочник', 'Мастер')
+MODEL_NAMES = ('Уютный', 'Модерн', 'Классика', 'Лофт', 'Спейс', 'Комфорт', 'Норд')
+WORK_DESCRIPTIONS = (
+    'Раскрой материалов',
+    'Изготовление каркаса',
+    'Обивка и отделка',
+    'Сборка изделия',
+    'Покраска и лакировка',
+    'Контроль качества и упаковка',
+)
+DEFAULT_FURNITURE_TYPES = (
+    ('Диван', 'upholstered'),
+    ('Кресло', 'upholstered'),
+    ('Шкаф', 'case'),
+    ('Обеденный стол', 'case'),
+    ('Офисный стол', 'office'),
+    ('Кухонный гарнитур', 'kitchen'),
+)
+
+# Заказы старше этого срока в основном уже закрыты.
+ACTIVE_WINDOW = timedelta(days=90)
+HISTORY = timedelta(days=3 * 365)
+# Доля заказов от заказчиков, которые уже делали заказ.
+REPEAT_CUSTOMERS = 0.3
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Позволяет задать created_at вручную, отключив auto_now_add."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class SyntheticDataGenerator:
+    """
+    Генератор больших объемов правдоподобных данных.
+
+    Все строки, включая промежуточные таблицы Order.workshops и
+    OrderWorkJournal.workers, вставляются через bulk_create пачками,
+    каждая пачка - в своей транзакции. Сигналы при этом не вызываются,
+    поэтому денормализованные поля заказа и журнала заполняются сразу,
+    а показатели цехов и трудозатраты рабочих пересчитываются в конце.
+    """
+
+    def __init__(self, orders=0, workers=100, workshops=10,
+                 journal_per_order=3, seed=None, batch_size=5000, log=None):
+        self.orders = orders
+        self.workers = workers
+        self.workshops = workshops
+        self.journal_per_order = journal_per_order
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.log = log or (lambda message: None)
+        self.rows = 0
+
+    def run(self):
+        """Создает данные и возвращает количество вставленных строк."""
+        self.now = timezone.now()
+        self.customers = []
+        furniture_types = self.create_furniture_types()
+        workshop_ids = self.create_workshops()
+        self.workers_by_workshop = self.create_workers(workshop_ids)
+
+        created = 0
+        while created < self.orders:
+            size = min(self.batch_size, self.orders - created)
+            with transaction.atomic():
+                self.create_orders(size, furniture_types, workshop_ids)
+            created += size
+            self.log(f'Заказы: {created}/{self.orders}')
+
+        stats.rebuild()
+        reports.rebuild_worker_labor(self.batch_size)
+        cache.bump_version(cache.WORKSHOPS, cache.FURNITURE_TYPES)
+        return self.rows
+
+    def create_furniture_types(self):
+        furniture_types = list(FurnitureType.objects.all())
+        if not furniture_types:
+            furniture_types = FurnitureType.objects.bulk_create(
+                FurnitureType(title=title, category=category)
+                for title, category in DEFAULT_FURNITURE_TYPES
+            )
+            self.rows += len(furniture_types)
+        return furniture_types
+
+    def create_workshops(self):
+        if self.workshops:
+            supervisor = User.objects.filter(is_superuser=True).first()
+            first_number = (
+                Workshop.objects.aggregate(last=Max('workshop_number'))['last'] or 0
+            ) + 1
+            Workshop.objects.bulk_create(
+                (
+                    Workshop(
+                        title=f'Цех {number}',
+                        workshop_number=number,
+                        supervisor=supervisor
+                    )
+                    for number in range(first_number, first_number + self.workshops)
+                ),
+                batch_size=self.batch_size
+            )
+            self.rows += self.workshops
+            self.log(f'Цеха: {self.workshops}')
+        return list(Workshop.objects.values_list('pk', flat=True))
+
+    def create_workers(self, workshop_ids):
+        if self.workers and workshop_ids:
+            rng = self.random
+            Worker.objects.bulk_create(
+                (
+                    Worker(
+                        first_name=rng.choice(FIRST_NAMES),
+                        last_name=rng.choice(LAST_NAMES),
+                        patronymic=rng.choice(PATRONYMICS),
+                        position=rng.choice(POSITIONS),
+                        workshop_id=rng.choice(workshop_ids),
+                        hire_date=(self.now - timedelta(days=rng.randint(30, 3650))).date()
+                    )
+                    for _ in range(self.workers)
+                ),
+                batch_size=self.batch_size
+            )
+            self.rows += self.workers
+            self.log(f'Рабочие: {self.workers}')
+        workers_by_workshop = {}
+        for worker_id, workshop_id in Worker.objects.values_list('pk', 'workshop_id'):
+            workers_by_workshop.setdefault(workshop_id, []).append(worker_id)
+        return workers_by_workshop
+
+    def pick_customer(self):
+        """Имя и телефон нового или уже известного заказчика."""
+        rng = self.random
+        if self.customers and rng.random() < REPEAT_CUSTOMERS:
+            return rng.choice(self.customers)
+        customer = (
+            f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            f'+7({rng.randint(900, 999)}){rng.randint(100, 999)}-'
+            f'{rng.randint(10, 99)}-{rng.randint(10, 99)}'
+        )
+        self.customers.append(customer)
+        return customer
+
+    def pick_status(self, created_at):
+        if self.now - created_at > ACTIVE_WINDOW:
+            statuses, weights = ('completed', 'cancelled', 'in_progress'), (90, 8, 2)
+        else:
+            statuses, weights = ('new', 'in_progress', 'completed', 'cancelled'), (30, 45, 20, 5)
+        return self.random.choices(statuses, weights)[0]
+
+    def build_journal(self, order, workshop_ids):
+        """Записи журнала заказа и рабочие каждой записи."""
+        rng = self.random
+        if order.status == 'new' or not self.journal_per_order or not workshop_ids:
+            return []
+        entries = []
+        for _ in range(rng.randint(1, self.journal_per_order)):
+            workshop_id = rng.choice(workshop_ids)
+            start_time = min(
+                order.created_at + timedelta(hours=rng.randint(1, 24 * 30)),
+                self.now
+            )
+            end_time = start_time + timedelta(hours=rng.randint(1, 8))
+            if order.status == 'in_progress' and end_time > self.now:
+                end_time = None
+            staff = self.workers_by_workshop.get(workshop_id, [])
+            workers = rng.sample(staff, min(len(staff), rng.randint(1, 3)))
+            entry = OrderWorkJournal(
+                workshop_id=workshop_id,
+                start_time=start_time,
+                end_time=end_time,
+                work_description=rng.choice(WORK_DESCRIPTIONS)
+            )
+            entry.fill_labor_fields()
+            if entry.duration is not None:
+                entry.labor = entry.duration * len(workers)
+            entries.append((entry, workers))
+        return entries
+
+    def create_orders(self, size, furniture_types, workshop_ids):
+        rng = self.random
+        orders = []
+        order_workshops = []
+        journals = []
+        for _ in range(size):
+            created_at = self.now - timedelta(seconds=rng.randint(0, int(HISTORY.total_seconds())))
+            furniture_type = rng.choice(furniture_types)
+            deadline = created_at.date() + timedelta(days=rng.randint(7, 60))
+            customer_name, customer_phone = self.pick_customer()
+            order = Order(
+                title=f'{furniture_type.title} "{rng.choice(MODEL_NAMES)}"',
+                customer_name=customer_name,
+                customer_phone=customer_phone,
+                furniture_type=furniture_type,
+                priority=rng.choices(('low', 'medium', 'high', 'urgent'), (20, 50, 22, 8))[0],
+                deadline=deadline,
+                total_cost=Decimal(rng.randint(5000, 300000)),
+                created_at=created_at,
+            )
+            order.status = self.pick_status(created_at)
+            if order.status == 'completed':
+                order.completion_date = min(
+                    deadline + timedelta(days=rng.randint(-5, 5)),
+                    self.now.date()
+                )
+            workshops = rng.sample(workshop_ids, min(len(workshop_ids), rng.randint(1, 3)))
+            journal = self.build_journal(order, workshops)
+            order.workshop_count = len(workshops)
+            if journal:
+                order.last_journal_at = max(entry.start_time for entry, _ in journal)
+            orders.append(order)
+            order_workshops.append(workshops)
+            journals.append(journal)
+
+        Customer.objects.assign(orders)
+        ChangeSequence.objects.assign(orders)
+        with explicit_created_at(Order):
+            Order.objects.bulk_create(orders)
+
+        OrderWorkshops = Order.workshops.through
+        workshop_links = [
+            OrderWorkshops(order_id=order.pk, workshop_id=workshop_id)
+            for order, workshops in zip(orders, order_workshops)
+            for workshop_id in workshops
+        ]
+        OrderWorkshops.objects.bulk_create(workshop_links)
+
+        entries = []
+        for order, journal in zip(orders, journals):
+            for entry, workers in journal:
+                entry.order_id = order.pk
+                entries.append((entry, workers))
+        OrderWorkJournal.objects.bulk_create(
+            ChangeSequence.objects.assign(entry for entry, _ in entries)
+        )
+
+        JournalWorkers = OrderWorkJournal.workers.through
+        worker_links = [
+            JournalWorkers(orderworkjournal_id=entry.pk, worker_id=worker_id)
+            for entry, workers in entries
+            for worker_id in workers
+        ]
+        JournalWorkers.objects.bulk_create(worker_links)
+
+        self.rows += len(orders) + len(workshop_links) + len(entries) + len(worker_links)
@@ -0,0 +1,276 @@
+"""
+Импорт заказов из CSV.
+
+Файл читается построчно, строки проверяются пачками формой
+OrderImportForm - теми же правилами, что и OrderForm, но тип мебели
+и цеха ищутся в словарях, загруженных один раз на весь импорт. Каждая
+пачка сохраняется через bulk_create в своей транзакции; ошибочные
+строки попадают в отчет и не мешают сохранению остальных.
+"""
+import csv
+import io
+from itertools import islice
+
+from django import forms
+from django.db import DatabaseError
+
+from . import cache, stats
+from .forms import OrderForm
+from .models import ChangeSequence, Customer, FurnitureType, Order, Workshop
+from .transactions import atomic_retry
+
+# Допустимые заголовки столбцов: имя поля, подпись поля и заголовок выгрузки.
+COLUMNS = {
+    'title': ('title', 'Название'),
+    'description': ('description', 'Описание'),
+    'customer_name': ('customer_name', 'Имя заказчика', 'Заказчик'),
+    'customer_phone': ('customer_phone', 'Телефон заказчика', 'Телефон'),
+    'furniture_type': ('furniture_type', 'Тип мебели'),
+    'workshops': ('workshops', 'Цеха для выполнения', 'Цеха'),
+    'status': ('status', 'Статус'),
+    'priority': ('priority', 'Приоритет'),
+    'deadline': ('deadline', 'Срок выполнения'),
+    'total_cost': ('total_cost', 'Общая стоимость', 'Стоимость'),
+    'notes': ('notes', 'Примечания'),
+}
+DEFAULTS = {'status': 'new', 'priority': 'medium'}
+MAX_ERRORS = 1000
+
+
+class Lookups:
+    """Типы мебели и цеха, загруженные одним запросом на модель."""
+
+    def __init__(self):
+        self.furniture_types = {}
+        for furniture_type in FurnitureType.objects.all():
+            self.furniture_types[str(furniture_type.pk)] = furniture_type
+            self.furniture_types[furniture_type.title.casefold()] = furniture_type
+        self.workshops = {}
+        for workshop in Workshop.objects.all():
+            self.workshops[str(workshop.workshop_number)] = workshop
+            self.workshops[workshop.title.casefold()] = workshop
+        self.statuses = {label.casefold(): code for code, label in Order.STATUS_CHOICES}
+        self.priorities = {label.casefold(): code for code, label in Order.PRIORITY_CHOICES}
+
+
+class OrderImportForm(OrderForm):
+    """
+    OrderForm, в которой тип мебели и цеха задаются текстом:
+    названием или номером (цеха - через запятую). Они проверяются по
+    словарям Lookups и исключены из проверки модели, которая иначе
+    запрашивала бы тип мебели из базы для каждой строки.
+    """
+
+    furniture_type = forms.CharField(label='Тип мебели')
+    workshops = forms.CharField(label='Цеха для выполнения')
+
+    class Meta(OrderForm.Meta):
+        fields = tuple(
+            name for name in OrderForm.Meta.fields
+            if name not in ('furniture_type', 'workshops')
+        )
+
+    def __init__(self, *args, lookups, **kwargs):
+        self.lookups = lookups
+        super().__init__(*args, **kwargs)
+
+    def rebind(self, data):
+        """
+        Связывает форму со следующей строкой. Создание формы копирует
+        все ее поля и обходится дороже самой проверки, поэтому на весь
+        импорт создается одна форма.
+        """
+        self.data = data
+        self.is_bound = True
+        self.instance = Order()
+        self._errors = None
+        self._bound_fields_cache = {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'furniture_type' in cleaned_data:
+            self.instance.furniture_type = cleaned_data['furniture_type']
+        return cleaned_data
+
+    def clean_furniture_type(self):
+        value = self.cleaned_data['furniture_type'].strip()
+        furniture_type = self.lookups.furniture_types.get(value.casefold())
+        if furniture_type is None:
+            raise forms.ValidationError(f'Неизвестный тип мебели «{value}».')
+        return furniture_type
+
+    def clean_workshops(self):
+        workshops = []
+        for value in self.cleaned_data['workshops'].split(','):
+            value = value.strip()
+            if not value:
+                continue
+            key = value.casefold()
+            if key.startswith('цех '):
+                key = key[4:].strip()
+            workshop = self.lookups.workshops.get(key)
+            if workshop is None:
+                raise forms.ValidationError(f'Неизвестный цех «{value}».')
+            if workshop not in workshops:
+                workshops.append(workshop)
+        if not workshops:
+            raise forms.ValidationError('Укажите хотя бы один цех.')
+        return workshops
+
+
+class ImportResult:
+    """Итог импорта: созданные заказы и ошибки по номерам строк."""
+
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+class OrderImporter:
+    """Импорт заказов из CSV пачками по batch_size строк."""
+
+    def __init__(self, batch_size=500, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    def open(self, file):
+        """Текстовый поток из двоичного файла; разделитель определяется сам."""
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        return csv.reader(text, dialect)
+
+    def run(self, file):
+        self.lookups = Lookups()
+        self.form = OrderImportForm(lookups=self.lookups)
+        result = ImportResult()
+        try:
+            reader = self.open(file)
+            header = next(reader, None)
+        except UnicodeDecodeError:
+            result.add_error(1, 'Файл должен быть в кодировке UTF-8.')
+            return result
+        if header is None:
+            result.add_error(1, 'Файл пуст.')
+            return result
+        columns = self.map_columns(header, result)
+        if columns is None:
+            return result
+
+        # Номер строки файла с учетом заголовка.
+        rows = enumerate(reader, start=2)
+        workshop_ids = set()
+        try:
+            while batch := list(islice(rows, self.batch_size)):
+                valid = self.validate(batch, columns, result)
+                if valid and not self.dry_run:
+                    self.save(valid, result)
+                    for _, _, workshops in valid:
+                        workshop_ids.update(workshop.pk for workshop in workshops)
+        except UnicodeDecodeError:
+            result.add_error(result.total + 2, 'Файл должен быть в кодировке UTF-8.')
+        except csv.Error as error:
+            result.add_error(result.total + 2, f'Неверный формат CSV: {error}')
+
+        if result.created:
+            stats.refresh_active_orders(workshop_ids)
+            cache.bump_version(cache.WORKSHOPS, cache.FURNITURE_TYPES)
+        return result
+
+    def map_columns(self, header, result):
+        """Индексы столбцов по именам полей или None, если нет обязательных."""
+        aliases = {
+            alias.casefold(): field
+            for field, names in COLUMNS.items()
+            for alias in names
+        }
+        columns = {}
+        for index, name in enumerate(header):
+            field = aliases.get(name.strip().casefold())
+            if field and field not in columns:
+                columns[field] = index
+        required = [
+            name for name, field in OrderForm.base_fields.items()
+            if field.required and name not in columns and name not in DEFAULTS
+        ]
+        if required:
+            labels = ', '.join(COLUMNS[name][1] for name in required)
+            result.add_error(1, f'Нет обязательных столбцов: {labels}.')
+            return None
+        return columns
+
+    def row_data(self, row, columns):
+        data = {
+            field: row[index].strip() if index < len(row) else ''
+            for field, index in columns.items()
+        }
+        for field, default in DEFAULTS.items():
+            data[field] = data.get(field) or default
+        data['status'] = self.lookups.statuses.get(data['status'].casefold(), data['status'])
+        data['priority'] = self.lookups.priorities.get(data['priority'].casefold(), data['priority'])
+        if data.get('total_cost'):
+            data['total_cost'] = data['total_cost'].replace(' ', '').replace(',', '.')
+        return data
+
+    def validate(self, batch, columns, result):
+        """Проверяет пачку строк и возвращает (строка, заказ, цеха) для верных."""
+        valid = []
+        for line, row in batch:
+            result.total += 1
+            if not any(value.strip() for value in row):
+                continue
+            form = self.form
+            form.rebind(self.row_data(row, columns))
+            if form.is_valid():
+                result.valid += 1
+                valid.append((line, form.instance, form.cleaned_data['workshops']))
+                continue
+            for field, messages in form.errors.items():
+                label = form.fields[field].label if field in form.fields else ''
+                for message in messages:
+                    result.add_error(line, f'{label}: {message}' if label else message)
+        return valid
+
+    @atomic_retry
+    def insert(self, orders, workshops):
+        # При повторе после блокировки заказы вставляются заново
+        # с теми же ключами: откат освободил их.
+        Customer.objects.assign(orders)
+        ChangeSequence.objects.assign(orders)
+        Order.objects.bulk_create(orders)
+        OrderWorkshops = Order.workshops.through
+        OrderWorkshops.objects.bulk_create(
+            OrderWorkshops(order_id=order.pk, workshop_id=workshop.pk)
+            for order, order_workshops in zip(orders, workshops)
+            for workshop in order_workshops
+        )
+
+    def save(self, valid, result):
+        """
+        Сохраняет пачку одной транзакцией. bulk_create не вызывает
+        сигналы и save(), поэтому количество цехов и заказчики заказов
+        заполняются сразу.
+        """
+        orders = []
+        for _, order, workshops in valid:
+            order.workshop_count = len(workshops)
+            orders.append(order)
+        try:
+            self.insert(orders, [workshops for _, _, workshops in valid])
+        except DatabaseError as error:
+            for line, _, _ in valid:
+                result.add_error(line, f'Ошибка сохранения пачки: {error}')
+            return
+        result.created += len(orders)
@@ -0,0 +1,53 @@
+from django.urls import reverse
+from exhibits.models import FurnitureType, Order, OrderWorkJournal, Workshop
+
+from .benchmark_endpoints import Command as EndpointsCommand
+
+
+class Command(EndpointsCommand):
+    help = (
+        'Замеряет задержку и SQL-запросы списков и форм админки на тестовой '
+        'базе заданного размера'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(sizes='1000000', requests=20)
+
+    def get_endpoints(self, user):
+        """Списки с фильтрами, поиском и далекой страницей, формы изменения."""
+        rng = self.random
+        order_ids = list(Order.objects.values_list('pk', flat=True)[:1000])
+        journal_ids = list(OrderWorkJournal.objects.values_list('pk', flat=True)[:1000])
+        workshop_id = Workshop.objects.values_list('pk', flat=True).first()
+        furniture_type_id = FurnitureType.objects.values_list('pk', flat=True).first()
+        orders = reverse('admin:exhibits_order_changelist')
+        journal = reverse('admin:exhibits_orderworkjournal_changelist')
+        workers = reverse('admin:exhibits_worker_changelist')
+
+        def url(path):
+            return lambda: (path, None)
+
+        def change_url(name, ids):
+            return lambda: (reverse(name, args=[rng.choice(ids)]), None)
+
+        return [
+            ('order_changelist', 'get', url(orders)),
+            ('order_status', 'get', url(f'{orders}?status__exact=in_progress')),
+            ('order_overdue', 'get', url(f'{orders}?overdue=yes')),
+            ('order_furniture_type', 'get',
+             url(f'{orders}?furniture_type__id__exact={furniture_type_id}')),
+            ('order_priority', 'get', url(f'{orders}?priority__exact=urgent')),
+            ('order_search', 'get', url(f'{orders}?q=шкаф')),
+            ('order_page_50', 'get', url(f'{orders}?p=50')),
+            ('order_change', 'get', change_url('admin:exhibits_order_change', order_ids)),
+            ('journal_changelist', 'get', url(journal)),
+            ('journal_workshop', 'get', url(f'{journal}?workshop__id__exact={workshop_id}')),
+            ('journal_change', 'get',
+             change_url('admin:exhibits_orderworkjournal_change', journal_ids)),
+            ('worker_changelist', 'get', url(workers)),
+            ('workshop_autocomplete', 'get', url(
+                reverse('admin:autocomplete') +
+                '?app_label=exhibits&model_name=order&field_name=workshops&term=1'
+            )),
+        ]
@@ -0,0 +1,130 @@
+import asyncio
+import importlib
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches, reverse
+from exhibits.models import FurnitureType, Order, Workshop
+
+MODES = {
+    'sync': False,
+    'async': True,
+}
+
+
+def reload_urls():
+    """Заново строит маршруты, выбирающие представления по EXHIBITS_ASYNC_VIEWS."""
+    import exhibits.urls
+    import factory.urls
+    importlib.reload(exhibits.urls)
+    importlib.reload(factory.urls)
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность синхронных и асинхронных '
+        'представлений чтения через ASGI-обработчик при параллельной нагрузке '
+        'на текущей базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            default='1,10,50',
+            help='Количество одновременных запросов через запятую'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=300,
+            help='Количество запросов на каждую точку и уровень параллельности'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Начальное значение генератора случайных чисел'
+        )
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        self.random = random.Random(options['seed'])
+        targets = self.get_targets()
+        try:
+            for mode, enabled in MODES.items():
+                # N+1-middleware синхронное и сделало бы синхронной всю цепочку.
+                with override_settings(
+                    EXHIBITS_ASYNC_VIEWS=enabled,
+                    NPLUSONE_ENABLED=False,
+                    ALLOWED_HOSTS=['testserver']
+                ):
+                    reload_urls()
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'\nПредставления: {mode}'))
+                    for name, target in targets:
+                        for level in levels:
+                            result = asyncio.run(
+                                self.measure(target, options['requests'], level)
+                            )
+                            self.print_result(name, level, result)
+        finally:
+            reload_urls()
+
+    def get_targets(self):
+        """Точки в виде (имя, функция, возвращающая путь)."""
+        rng = self.random
+        order_ids = list(Order.objects.values_list('pk', flat=True)[:1000])
+        workshop_ids = list(Workshop.objects.values_list('pk', flat=True))
+        furniture_type_ids = list(FurnitureType.objects.values_list('pk', flat=True))
+
+        def url(name):
+            return lambda: reverse(name)
+
+        def random_url(name, key, ids):
+            return lambda: reverse(name, kwargs={key: rng.choice(ids)})
+
+        return [
+            ('index', url('exhibits:index')),
+            ('order_detail', random_url('exhibits:order_detail', 'order_id', order_ids)),
+            ('workshop_list', url('exhibits:workshop_list')),
+            ('workshop_detail', random_url('exhibits:workshop_detail', 'workshop_id', workshop_ids)),
+            ('furniture_type_list', url('exhibits:furniture_type_list')),
+            ('furniture_type_detail',
+             random_url('exhibits:furniture_type_detail', 'furniture_type_id', furniture_type_ids)),
+        ]
+
+    async def measure(self, target, requests, concurrency):
+        client = AsyncClient()
+        latencies = []
+        statuses = set()
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(target())
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {
+            'rps': requests / elapsed,
+            'p50_ms': percentiles[49],
+            'p95_ms': percentiles[94],
+            'statuses': sorted(statuses),
+        }
+
+    def print_result(self, name, level, result):
+        self.stdout.write(
+            f'  {name:<24} x{level:<4} {result["rps"]:8.1f} запр./с  '
+            f'p50 {result["p50_ms"]:8.2f} мс  p95 {result["p95_ms"]:8.2f} мс  '
+            f'коды {result["statuses"]}'
+        )
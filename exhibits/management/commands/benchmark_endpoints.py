@@ -0,0 +1,219 @@
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from exhibits.generator import SyntheticDataGenerator
+from exhibits.models import FurnitureType, Order, Workshop
+
+User = get_user_model()
+
+
+class QueryTimer:
+    """Обертка выполнения SQL, считающая запросы и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.count += 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и SQL-запросы представлений на тестовой базе '
+        'заданного размера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000',
+            help='Размеры наборов данных (количество заказов) через запятую'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Количество замеряемых запросов на каждую точку'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help='Количество незамеряемых запросов перед замером'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Начальное значение генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в формате JSON'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.random = random.Random(options['seed'])
+        results = {}
+        setup_test_environment()
+        try:
+            for size in sizes:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\nЗаказов: {size}'))
+                results[size] = self.run_dataset(size, options)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'django': django.get_version(),
+                    'python': platform.python_version(),
+                    'database': connection.vendor,
+                    'requests': options['requests'],
+                    'seed': options['seed'],
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f'\nРезультаты записаны в {options["output"]}')
+
+    def run_dataset(self, size, options):
+        """Создает тестовую базу, заполняет ее и замеряет все точки."""
+        # Отдельный файл на каждый размер: база на диске ближе к рабочей,
+        # чем база в памяти, и не смешивается с предыдущим замером.
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            tempfile.gettempdir(), f'factory_benchmark_{size}.sqlite3'
+        )
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            cache.clear()
+            SyntheticDataGenerator(orders=size, seed=options['seed']).run()
+            user = User.objects.create_superuser('benchmark', password='benchmark')
+            client = Client()
+            client.force_login(user)
+
+            results = {}
+            for name, method, target in self.get_endpoints(user):
+                results[name] = self.measure(
+                    client, method, target, options['requests'], options['warmup']
+                )
+                self.print_result(name, results[name])
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def get_endpoints(self, user):
+        """Точки в виде (имя, метод, функция, возвращающая url и данные)."""
+        rng = self.random
+        order_ids = list(Order.objects.values_list('pk', flat=True)[:1000])
+        active_ids = list(Order.active.values_list('pk', flat=True)[:1000])
+        workshop_ids = list(Workshop.objects.values_list('pk', flat=True))
+        furniture_type_ids = list(FurnitureType.objects.values_list('pk', flat=True))
+
+        def order_data():
+            return {
+                'title': 'Заказ для замера',
+                'description': 'Описание',
+                'customer_name': 'Заказчик',
+                'customer_phone': '+7(900)000-00-00',
+                'furniture_type': rng.choice(furniture_type_ids),
+                'workshops': rng.sample(workshop_ids, min(2, len(workshop_ids))),
+                'status': 'in_progress',
+                'priority': 'medium',
+                'deadline': (date.today() + timedelta(days=30)).isoformat(),
+                'total_cost': '10000.00',
+                'notes': '',
+            }
+
+        def url(name, **kwargs):
+            return lambda: (reverse(name, kwargs=kwargs), None)
+
+        def random_url(name, key, ids):
+            return lambda: (reverse(name, kwargs={key: rng.choice(ids)}), None)
+
+        return [
+            ('index', 'get', url('exhibits:index')),
+            ('order_detail', 'get', random_url('exhibits:order_detail', 'order_id', order_ids)),
+            ('workshop_list', 'get', url('exhibits:workshop_list')),
+            ('workshop_detail', 'get',
+             random_url('exhibits:workshop_detail', 'workshop_id', workshop_ids)),
+            ('furniture_type_list', 'get', url('exhibits:furniture_type_list')),
+            ('furniture_type_detail', 'get',
+             random_url('exhibits:furniture_type_detail', 'furniture_type_id', furniture_type_ids)),
+            ('users:profile', 'get', url('users:profile', username=user.username)),
+            ('order_create', 'post', lambda: (reverse('exhibits:order_create'), order_data())),
+            ('order_edit', 'post', lambda: (
+                reverse('exhibits:order_edit', kwargs={'order_id': rng.choice(order_ids)}),
+                order_data()
+            )),
+            ('complete_order', 'post',
+             random_url('exhibits:complete_order', 'order_id', active_ids or order_ids)),
+        ]
+
+    def measure(self, client, method, target, requests, warmup):
+        send = getattr(client, method)
+        for _ in range(warmup):
+            path, data = target()
+            send(path, data)
+
+        latencies = []
+        query_counts = []
+        sql_times = []
+        statuses = set()
+        for _ in range(requests):
+            path, data = target()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer):
+                started = time.perf_counter()
+                response = send(path, data)
+                latencies.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+            query_counts.append(timer.count)
+            sql_times.append(timer.elapsed * 1000)
+
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        else:
+            p50 = p95 = p99 = latencies[0]
+        return {
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'queries': round(statistics.mean(query_counts), 2),
+            'queries_max': max(query_counts),
+            'sql_ms': round(statistics.mean(sql_times), 3),
+            'statuses': sorted(statuses),
+        }
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f'  {name:<24} p50 {result["p50_ms"]:8.2f} мс  '
+            f'p95 {result["p95_ms"]:8.2f} мс  p99 {result["p99_ms"]:8.2f} мс  '
+            f'запросов {result["queries"]:6.1f}  SQL {result["sql_ms"]:7.2f} мс  '
+            f'коды {result["statuses"]}'
+        )
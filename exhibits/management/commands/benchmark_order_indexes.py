@@ -0,0 +1,128 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from exhibits.models import FurnitureType, Order, Workshop
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает план и время запросов списка заказов '
+        'с составными индексами и без них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=0,
+            help='Сколько временных заказов добавить перед замером '
+                 '(удаляются после завершения)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов каждого запроса'
+        )
+
+    def get_queries(self):
+        """Запросы в том виде, в котором их выполняют представления."""
+        furniture_type = FurnitureType.objects.first()
+        today = timezone.now().date()
+        return {
+            'index': Order.active.select_related('furniture_type')[:10],
+            'furniture_type_detail': Order.active.filter(
+                furniture_type=furniture_type
+            ).select_related('furniture_type')[:10],
+            'workshop_list': Workshop.objects.annotate(
+                active_order_count=Count(
+                    'orders', filter=Q(orders__status='in_progress')
+                )
+            ),
+            'overdue': Order.objects.filter(
+                status__in=['new', 'in_progress'],
+                deadline__lt=today
+            ).order_by().values('pk'),
+        }
+
+    def explain(self, queryset, label):
+        sql, params = queryset.query.sql_with_params()
+        # Метка делает текст запроса уникальным: sqlite3 кэширует
+        # подготовленные EXPLAIN и не перестраивает их после DROP INDEX.
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {label} */', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def measure(self, repeat, label):
+        results = {}
+        for name, queryset in self.get_queries().items():
+            plan = self.explain(queryset, label)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            results[name] = (plan, elapsed)
+        return results
+
+    def seed(self, count):
+        furniture_types = list(FurnitureType.objects.all())
+        if not furniture_types:
+            furniture_types = [
+                FurnitureType.objects.create(title='Тестовый тип', category=category)
+                for category, _ in FurnitureType.FURNITURE_CATEGORIES
+            ]
+        # Как на реальной фабрике: большая часть заказов давно закрыта.
+        statuses = ('completed', 'cancelled', 'new', 'in_progress')
+        weights = (85, 5, 5, 5)
+        today = timezone.now().date()
+        orders = (
+            Order(
+                title=f'Тестовый заказ {number}',
+                customer_name='Заказчик',
+                customer_phone='+70000000000',
+                furniture_type=random.choice(furniture_types),
+                status=random.choices(statuses, weights)[0],
+                deadline=today + timedelta(days=random.randint(-720, 60)),
+            )
+            for number in range(count)
+        )
+        Order.objects.bulk_create(orders, batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for index in Order._meta.indexes:
+                cursor.execute(
+                    f'DROP INDEX {connection.ops.quote_name(index.name)}'
+                )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with transaction.atomic():
+            if options['orders']:
+                self.stdout.write(f'Создание {options["orders"]} заказов...')
+                self.seed(options['orders'])
+            self.stdout.write(f'Всего заказов: {Order.objects.count()}')
+
+            after = self.measure(repeat, 'after')
+            self.drop_indexes()
+            before = self.measure(repeat, 'before')
+            # Удаление индексов и временные заказы откатываются вместе.
+            transaction.set_rollback(True)
+
+        for name in after:
+            before_plan, before_ms = before[name]
+            after_plan, after_ms = after[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}'))
+            self.stdout.write(f'  без индексов: {before_ms:.2f} мс')
+            for line in before_plan:
+                self.stdout.write(f'    {line}')
+            self.stdout.write(f'  с индексами:  {after_ms:.2f} мс')
+            for line in after_plan:
+                self.stdout.write(f'    {line}')
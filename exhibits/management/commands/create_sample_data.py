@@ -1,7 +1,10 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta, date
+from exhibits.generator import SyntheticDataGenerator
 from exhibits.models import FurnitureType, Workshop, Worker, Order, OrderWorkJournal
 
 User = get_user_model()
@@ -10,7 +13,42 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Создает тестовые данные для мебельной фабрики'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders', type=int,
+            help='Сгенерировать указанное количество заказов для нагрузочного тестирования'
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help='Количество генерируемых рабочих (по умолчанию 100)'
+        )
+        parser.add_argument(
+            '--workshops', type=int,
+            help='Количество генерируемых цехов (по умолчанию 10)'
+        )
+        parser.add_argument(
+            '--journal-per-order', type=int,
+            help='Максимальное количество записей журнала на заказ (по умолчанию 3)'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Начальное значение генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество заказов, вставляемых в одной транзакции'
+        )
+
     def handle(self, *args, **options):
+        sizes = {
+            name: options[name]
+            for name in ('orders', 'workers', 'workshops', 'journal_per_order')
+            if options[name] is not None
+        }
+        if sizes:
+            self.generate(sizes, options['seed'], options['batch_size'])
+            return
+
         # Создаем пользователя, если его нет
         user, created = User.objects.get_or_create(
             username='admin',
@@ -240,6 +278,26 @@ class Command(BaseCommand):
                 journal2.workers.add(worker2)
                 self.stdout.write(f'Создана запись в журнале: {journal2}')
 
+        self.print_totals()
+
+    def generate(self, sizes, seed, batch_size):
+        """Массовая генерация данных для нагрузочного тестирования."""
+        generator = SyntheticDataGenerator(
+            seed=seed,
+            batch_size=batch_size,
+            log=self.stdout.write,
+            **sizes
+        )
+        started = time.perf_counter()
+        rows = generator.run()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\nСоздано строк: {rows} за {elapsed:.1f} с '
+            f'({rows / max(elapsed, 1e-9):.0f} строк/с)'
+        ))
+        self.print_totals()
+
+    def print_totals(self):
         self.stdout.write(self.style.SUCCESS('\nТестовые данные успешно созданы!'))
         self.stdout.write(f'Всего типов мебели: {FurnitureType.objects.count()}')
         self.stdout.write(f'Всего цехов: {Workshop.objects.count()}')
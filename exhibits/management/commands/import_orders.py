@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from exhibits.importer import OrderImporter
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заказы из CSV-файла пачками, сообщая об ошибочных строках'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV-файлу в кодировке UTF-8')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество строк, проверяемых и сохраняемых за одну транзакцию'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только проверить файл, не сохраняя заказы'
+        )
+
+    def handle(self, *args, **options):
+        importer = OrderImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        try:
+            with open(options['path'], 'rb') as file:
+                result = importer.run(file)
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+
+        for line, message in result.errors:
+            self.stderr.write(f'Строка {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... и еще {result.error_count - len(result.errors)} ошибок')
+
+        if options['dry_run']:
+            summary = f'Проверено строк: {result.total}, без ошибок: {result.valid}'
+        else:
+            summary = f'Обработано строк: {result.total}, создано заказов: {result.created}'
+        style = self.style.SUCCESS if not result.error_count else self.style.WARNING
+        self.stdout.write(style(f'{summary}, ошибок: {result.error_count}'))
@@ -0,0 +1,77 @@
+import argparse
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from exhibits import reports
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'неверная дата {value!r}, ожидается ГГГГ-ММ-ДД')
+
+
+class Command(BaseCommand):
+    help = 'Выводит человеко-часы по рабочим, цехам, заказам или дням за период'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group',
+            choices=list(reports.GROUPS),
+            default='worker',
+            help='Группировка отчета'
+        )
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=parse_date,
+            help='Начальная дата работы (ГГГГ-ММ-ДД), включительно'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=parse_date,
+            help='Конечная дата работы (ГГГГ-ММ-ДД), включительно'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Максимальное количество строк'
+        )
+        parser.add_argument(
+            '--csv',
+            help='Файл для отчета в формате CSV'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Перед отчетом полностью пересчитать трудозатраты'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = reports.rebuild()
+            self.stdout.write(f'Трудозатраты пересчитаны, дневных сумм рабочих: {count}')
+
+        rows = reports.labor_hours(
+            options['group'],
+            options['date_from'],
+            options['date_to'],
+            limit=options['limit']
+        )
+
+        if options['csv']:
+            with open(options['csv'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(('key', 'label', 'hours', 'entries'))
+                for row in rows:
+                    writer.writerow((row['key'], row['label'], row['hours'], row['entries']))
+            self.stdout.write(self.style.SUCCESS(f'Отчет записан в {options["csv"]}'))
+            return
+
+        for row in rows:
+            self.stdout.write(f'{row["label"]:<40} {row["hours"]:>12.2f} ч  записей {row["entries"]}')
+        total = sum(row['hours'] for row in rows)
+        self.stdout.write(self.style.SUCCESS(f'Всего: {total:.2f} чел.-ч., строк: {len(rows)}'))
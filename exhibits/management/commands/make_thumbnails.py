@@ -0,0 +1,64 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from exhibits import thumbnails
+from exhibits.models import OrderPhoto, PhotoBlob
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии фотографий заказов в несколько процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии всех фотографий, а не только необработанных'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Количество процессов (по умолчанию THUMBNAIL_WORKERS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Файлов в очереди пула и в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        # Одинаковые фотографии хранятся одним файлом и обрабатываются один раз.
+        blobs = PhotoBlob.objects.filter(ref_count__gt=0).order_by('pk')
+        if not options['all']:
+            blobs = blobs.filter(
+                name__in=OrderPhoto.objects.filter(renditions={}).values('image')
+            )
+        storage = OrderPhoto._meta.get_field('image').storage
+        total = blobs.count()
+        done = failed = 0
+        last_pk = 0
+        with thumbnails.create_executor(options['workers']) as executor:
+            while batch := list(
+                blobs.filter(pk__gt=last_pk).values_list('pk', 'name')[:options['batch_size']]
+            ):
+                last_pk = batch[-1][0]
+                futures = {
+                    executor.submit(
+                        thumbnails.render, storage.path(name), thumbnails.targets(name, storage)
+                    ): name
+                    for _, name in batch
+                }
+                with transaction.atomic():
+                    for future in as_completed(futures):
+                        name = futures[future]
+                        try:
+                            widths = future.result()
+                        except Exception as error:
+                            failed += 1
+                            self.stderr.write(f'{name}: {error}')
+                            continue
+                        OrderPhoto.objects.filter(image=name).update(renditions=widths)
+                        done += 1
+                self.stdout.write(f'Обработано {done + failed} из {total}')
+        self.stdout.write(self.style.SUCCESS(f'Копии созданы для {done} файлов, ошибок: {failed}'))
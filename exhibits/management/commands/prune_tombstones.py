@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from exhibits.models import ChangeSequence, Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые отметки об удалении записей для /api/sync/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Сколько дней хранить отметки; клиенты, не синхронизировавшиеся '
+                 'дольше, загрузят данные заново'
+        )
+
+    def handle(self, *args, **options):
+        old = Tombstone.objects.filter(
+            deleted_at__lt=timezone.now() - timedelta(days=options['days'])
+        )
+        with transaction.atomic():
+            horizon = old.aggregate(last=Max('change_seq'))['last']
+            if horizon is None:
+                self.stdout.write('Старых отметок нет')
+                return
+            # Клиент с отметкой до horizon мог пропустить удаление:
+            # sync() ответит ему 410, и он загрузит все заново.
+            ChangeSequence.objects.filter(pk=1, horizon__lt=horizon).update(horizon=horizon)
+            deleted, _ = Tombstone.objects.filter(change_seq__lte=horizon).delete()
+        self.stdout.write(self.style.SUCCESS(f'Удалено отметок: {deleted}'))
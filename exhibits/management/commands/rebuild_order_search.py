@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from exhibits import search
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет полнотекстовый индекс заказов'
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            raise CommandError('Полнотекстовый индекс поддерживается только в SQLite')
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Индекс поиска заказов перестроен'))
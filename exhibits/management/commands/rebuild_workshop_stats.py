@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from exhibits import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводные показатели загрузки всех цехов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Показатели пересчитаны для {count} цехов'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from exhibits.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает количество цехов и дату последней записи журнала у заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество заказов, пересчитываемых в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Order.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write('Заказов нет')
+            return
+
+        # refresh_counters() меняет только заказы с разошедшимися
+        # счетчиками, остальные сохраняют номер изменения.
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            end = min(start + batch_size, bounds['last'] + 1)
+            with transaction.atomic():
+                updated += Order.objects.filter(
+                    pk__gte=start, pk__lt=end
+                ).refresh_counters()
+            self.stdout.write(f'Проверены заказы до #{end - 1}, исправлено: {updated}')
+
+        self.stdout.write(self.style.SUCCESS(f'Счетчики исправлены у {updated} заказов'))
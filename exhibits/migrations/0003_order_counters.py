@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:29
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Order = apps.get_model('exhibits', 'Order')
+    OrderWorkJournal = apps.get_model('exhibits', 'OrderWorkJournal')
+    workshop_count = Order.workshops.through.objects.filter(
+        order_id=models.OuterRef('pk')
+    ).order_by().values('order_id').annotate(
+        count=models.Count('*')
+    ).values('count')
+    last_journal_at = OrderWorkJournal.objects.filter(
+        order_id=models.OuterRef('pk')
+    ).order_by().values('order_id').annotate(
+        last=models.Max('start_time')
+    ).values('last')
+    Order.objects.update(
+        workshop_count=Coalesce(models.Subquery(workshop_count), 0),
+        last_journal_at=models.Subquery(last_journal_at)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0002_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='last_journal_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последняя запись в журнале'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='workshop_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество цехов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    Workshop = apps.get_model('exhibits', 'Workshop')
+    Worker = apps.get_model('exhibits', 'Worker')
+    Order = apps.get_model('exhibits', 'Order')
+    OrderWorkJournal = apps.get_model('exhibits', 'OrderWorkJournal')
+    WorkshopStats = apps.get_model('exhibits', 'WorkshopStats')
+
+    stats = {
+        pk: WorkshopStats(workshop_id=pk)
+        for pk in Workshop.objects.values_list('pk', flat=True)
+    }
+    workers = Worker.objects.values('workshop_id').annotate(count=models.Count('*'))
+    for row in workers:
+        stats[row['workshop_id']].worker_count = row['count']
+    active = Order.workshops.through.objects.filter(
+        order__status='in_progress'
+    ).values('workshop_id', 'order__priority').annotate(count=models.Count('*'))
+    for row in active:
+        item = stats[row['workshop_id']]
+        field = f'active_{row["order__priority"]}'
+        setattr(item, field, getattr(item, field) + row['count'])
+        item.active_orders += row['count']
+    entries = OrderWorkJournal.objects.filter(
+        end_time__isnull=True
+    ).values('workshop_id').annotate(count=models.Count('*'))
+    for row in entries:
+        stats[row['workshop_id']].open_journal_entries = row['count']
+    busy = OrderWorkJournal.workers.through.objects.filter(
+        orderworkjournal__end_time__isnull=True
+    ).values('orderworkjournal__workshop_id').annotate(
+        count=models.Count('worker_id', distinct=True)
+    )
+    for row in busy:
+        stats[row['orderworkjournal__workshop_id']].busy_workers = row['count']
+    WorkshopStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0003_order_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkshopStats',
+            fields=[
+                ('workshop', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='exhibits.workshop', verbose_name='Цех')),
+                ('worker_count', models.PositiveIntegerField(default=0, verbose_name='Рабочих')),
+                ('active_orders', models.PositiveIntegerField(default=0, verbose_name='Заказов в работе')),
+                ('active_low', models.PositiveIntegerField(default=0, verbose_name='В работе с низким приоритетом')),
+                ('active_medium', models.PositiveIntegerField(default=0, verbose_name='В работе со средним приоритетом')),
+                ('active_high', models.PositiveIntegerField(default=0, verbose_name='В работе с высоким приоритетом')),
+                ('active_urgent', models.PositiveIntegerField(default=0, verbose_name='Срочных в работе')),
+                ('open_journal_entries', models.PositiveIntegerField(default=0, verbose_name='Незакрытых записей журнала')),
+                ('busy_workers', models.PositiveIntegerField(default=0, verbose_name='Рабочих занято сейчас')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Показатели цеха',
+                'verbose_name_plural': 'Показатели цехов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderworkjournal',
+            index=models.Index(fields=['workshop', 'end_time'], name='journal_workshop_end_idx'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def fill_labor(apps, schema_editor):
+    OrderWorkJournal = apps.get_model('exhibits', 'OrderWorkJournal')
+    WorkerLabor = apps.get_model('exhibits', 'WorkerLabor')
+    JournalWorkers = OrderWorkJournal.workers.through
+
+    OrderWorkJournal.objects.update(
+        work_date=TruncDate('start_time'),
+        duration=models.ExpressionWrapper(
+            models.F('end_time') - models.F('start_time'),
+            output_field=models.DurationField()
+        )
+    )
+
+    worker_count = JournalWorkers.objects.filter(
+        orderworkjournal_id=models.OuterRef('pk')
+    ).order_by().values('orderworkjournal_id').annotate(
+        count=models.Count('*')
+    ).values('count')
+    OrderWorkJournal.objects.update(
+        labor=models.ExpressionWrapper(
+            models.F('duration') * Coalesce(models.Subquery(worker_count), 0),
+            output_field=models.DurationField()
+        )
+    )
+
+    rows = JournalWorkers.objects.filter(
+        orderworkjournal__duration__isnull=False
+    ).values('worker_id', 'orderworkjournal__work_date').annotate(
+        duration=models.Sum('orderworkjournal__duration'),
+        entries=models.Count('*')
+    ).order_by()
+    WorkerLabor.objects.bulk_create(
+        (
+            WorkerLabor(
+                worker_id=row['worker_id'],
+                work_date=row['orderworkjournal__work_date'],
+                duration=row['duration'],
+                entries=row['entries']
+            )
+            for row in rows
+        ),
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0004_workshop_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerLabor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('work_date', models.DateField(verbose_name='Дата работы')),
+                ('duration', models.DurationField(verbose_name='Отработано')),
+                ('entries', models.PositiveIntegerField(default=0, verbose_name='Записей журнала')),
+            ],
+            options={
+                'verbose_name': 'Трудозатраты рабочего',
+                'verbose_name_plural': 'Трудозатраты рабочих',
+                'ordering': ('-work_date',),
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='orderworkjournal',
+            name='journal_workshop_end_idx',
+        ),
+        migrations.AddField(
+            model_name='orderworkjournal',
+            name='duration',
+            field=models.DurationField(editable=False, null=True, verbose_name='Длительность'),
+        ),
+        migrations.AddField(
+            model_name='orderworkjournal',
+            name='labor',
+            field=models.DurationField(editable=False, help_text='Длительность, умноженная на количество рабочих', null=True, verbose_name='Трудозатраты'),
+        ),
+        migrations.AddField(
+            model_name='orderworkjournal',
+            name='work_date',
+            field=models.DateField(editable=False, null=True, verbose_name='Дата работы'),
+        ),
+        migrations.AddIndex(
+            model_name='orderworkjournal',
+            index=models.Index(fields=['workshop', 'end_time', 'work_date', 'labor'], name='journal_workshop_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderworkjournal',
+            index=models.Index(fields=['work_date', 'workshop', 'order', 'labor'], name='journal_work_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='workerlabor',
+            name='worker',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='labor', to='exhibits.worker', verbose_name='Рабочий'),
+        ),
+        migrations.AddIndex(
+            model_name='workerlabor',
+            index=models.Index(fields=['work_date', 'worker', 'duration', 'entries'], name='worker_labor_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='workerlabor',
+            constraint=models.UniqueConstraint(fields=('worker', 'work_date'), name='worker_labor_unique'),
+        ),
+        migrations.RunPython(fill_labor, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE exhibits_order_fts USING fts5(
+        title, description, customer_name, notes, journal,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER exhibits_order_fts_insert AFTER INSERT ON exhibits_order
+    BEGIN
+        INSERT INTO exhibits_order_fts (rowid, title, description, customer_name, notes, journal)
+        VALUES (new.id, new.title, new.description, new.customer_name, new.notes, '');
+    END
+    """,
+    """
+    CREATE TRIGGER exhibits_order_fts_update
+    AFTER UPDATE OF title, description, customer_name, notes ON exhibits_order
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+        OR old.customer_name IS NOT new.customer_name OR old.notes IS NOT new.notes
+    BEGIN
+        UPDATE exhibits_order_fts
+        SET title = new.title, description = new.description,
+            customer_name = new.customer_name, notes = new.notes
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER exhibits_order_fts_delete AFTER DELETE ON exhibits_order
+    BEGIN
+        DELETE FROM exhibits_order_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER exhibits_journal_fts_insert AFTER INSERT ON exhibits_orderworkjournal
+    WHEN new.work_description != ''
+    BEGIN
+        UPDATE exhibits_order_fts SET journal = coalesce((
+            SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+            WHERE order_id = new.order_id
+        ), '') WHERE rowid = new.order_id;
+    END
+    """,
+    """
+    CREATE TRIGGER exhibits_journal_fts_update
+    AFTER UPDATE OF work_description, order_id ON exhibits_orderworkjournal
+    WHEN old.work_description IS NOT new.work_description OR old.order_id IS NOT new.order_id
+    BEGIN
+        UPDATE exhibits_order_fts SET journal = coalesce((
+            SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+            WHERE order_id = exhibits_order_fts.rowid
+        ), '') WHERE rowid IN (old.order_id, new.order_id);
+    END
+    """,
+    """
+    CREATE TRIGGER exhibits_journal_fts_delete AFTER DELETE ON exhibits_orderworkjournal
+    WHEN old.work_description != ''
+    BEGIN
+        UPDATE exhibits_order_fts SET journal = coalesce((
+            SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+            WHERE order_id = old.order_id
+        ), '') WHERE rowid = old.order_id;
+    END
+    """,
+    """
+    INSERT INTO exhibits_order_fts (rowid, title, description, customer_name, notes, journal)
+    SELECT o.id, o.title, o.description, o.customer_name, o.notes,
+           coalesce((SELECT group_concat(j.work_description, ' ')
+                     FROM exhibits_orderworkjournal j WHERE j.order_id = o.id), '')
+    FROM exhibits_order o
+    """,
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS exhibits_journal_fts_delete',
+    'DROP TRIGGER IF EXISTS exhibits_journal_fts_update',
+    'DROP TRIGGER IF EXISTS exhibits_journal_fts_insert',
+    'DROP TRIGGER IF EXISTS exhibits_order_fts_delete',
+    'DROP TRIGGER IF EXISTS exhibits_order_fts_update',
+    'DROP TRIGGER IF EXISTS exhibits_order_fts_insert',
+    'DROP TABLE IF EXISTS exhibits_order_fts',
+)
+
+
+def run_sqlite(statements):
+    """Полнотекстовый индекс есть только в SQLite; на других СУБД - обычный поиск."""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0005_journal_labor'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:09
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def normalize_phone(phone):
+    # Копия exhibits.models.normalize_phone на момент миграции.
+    digits = re.sub(r'[^0-9]', '', phone or '')
+    if len(digits) == 11 and digits[0] == '8':
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    return digits
+
+
+def fill_customers(apps, schema_editor):
+    """
+    Объединяет заказы с одинаковым нормализованным телефоном в заказчиков.
+    Заказы читаются пачками по id; имя и телефон заказчика берутся
+    из самого раннего его заказа.
+    """
+    Customer = apps.get_model('exhibits', 'Customer')
+    Order = apps.get_model('exhibits', 'Order')
+    table = schema_editor.quote_name(Order._meta.db_table)
+    last_pk = 0
+    while True:
+        batch = list(
+            Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'customer_name', 'customer_phone'
+            )[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        keys = {}
+        for pk, name, phone in batch:
+            key = normalize_phone(phone)
+            if key:
+                keys.setdefault(key, (name, phone))
+        customers = dict(
+            Customer.objects.filter(phone_key__in=keys).values_list('phone_key', 'pk')
+        )
+        missing = [key for key in keys if key not in customers]
+        Customer.objects.bulk_create(
+            Customer(name=keys[key][0], phone=keys[key][1], phone_key=key)
+            for key in missing
+        )
+        customers.update(
+            Customer.objects.filter(phone_key__in=missing).values_list('phone_key', 'pk')
+        )
+        # bulk_update строит CASE на каждую строку и в десятки раз
+        # медленнее простого UPDATE по первичному ключу.
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {table} SET customer_id = %s WHERE id = %s',
+                [
+                    (customers[normalize_phone(phone)], pk)
+                    for pk, _, phone in batch
+                    if normalize_phone(phone)
+                ]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0006_order_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Customer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Имя')),
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('phone_key', models.CharField(editable=False, max_length=20, unique=True, verbose_name='Нормализованный телефон')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Заказчик',
+                'verbose_name_plural': 'Заказчики',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='exhibits.customer', verbose_name='Заказчик'),
+        ),
+        migrations.RunPython(fill_customers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_idx'),
+        ),
+    ]
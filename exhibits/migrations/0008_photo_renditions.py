@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0007_customers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderphoto',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии'),
+        ),
+    ]
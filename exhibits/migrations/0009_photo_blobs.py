@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:18
+
+import exhibits.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Ссылки на уже загруженные файлы; сами файлы остаются на месте."""
+    OrderPhoto = apps.get_model('exhibits', 'OrderPhoto')
+    PhotoBlob = apps.get_model('exhibits', 'PhotoBlob')
+    rows = OrderPhoto.objects.exclude(image='').values('image').annotate(
+        count=models.Count('*')
+    ).order_by()
+    PhotoBlob.objects.bulk_create(
+        (PhotoBlob(name=row['image'], ref_count=row['count']) for row in rows),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0008_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл фотографии',
+                'verbose_name_plural': 'Файлы фотографий',
+            },
+        ),
+        migrations.AlterField(
+            model_name='orderphoto',
+            name='image',
+            field=models.ImageField(db_index=True, storage=exhibits.storage.photo_storage, upload_to='orders/photos/', verbose_name='Изображение'),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_updated_at(apps, schema_editor):
+    """
+    Существующим строкам ставит время создания, а не время миграции:
+    иначе у всех записей было бы одно и то же время изменения.
+    У рабочих времени создания нет, им остается время миграции.
+    """
+    Order = apps.get_model('exhibits', 'Order')
+    Workshop = apps.get_model('exhibits', 'Workshop')
+    OrderWorkJournal = apps.get_model('exhibits', 'OrderWorkJournal')
+    Order.objects.update(updated_at=models.F('created_at'))
+    Workshop.objects.update(updated_at=models.F('created_at'))
+    OrderWorkJournal.objects.update(
+        updated_at=Coalesce('end_time', 'start_time')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0009_photo_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderworkjournal',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='workshop',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+import exhibits.models
+from django.db import migrations, models
+
+TRACKED_MODELS = ('Workshop', 'Worker', 'Order', 'OrderWorkJournal')
+
+
+def fill_change_seq(apps, schema_editor):
+    """
+    Нумерует существующие строки: каждая таблица получает свой диапазон
+    номеров по порядку ключей, а счетчик - последний выданный номер.
+    """
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    offset = 0
+    with connection.cursor() as cursor:
+        for name in TRACKED_MODELS:
+            table = quote(apps.get_model('exhibits', name)._meta.db_table)
+            cursor.execute(f'SELECT MAX(id) FROM {table}')
+            last_id = cursor.fetchone()[0] or 0
+            cursor.execute(f'UPDATE {table} SET change_seq = id + %s', [offset])
+            offset += last_id
+    ChangeSequence = apps.get_model('exhibits', 'ChangeSequence')
+    ChangeSequence.objects.create(pk=1, value=offset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0011_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Последний номер')),
+                ('horizon', models.BigIntegerField(default=0, verbose_name='Граница удаленных')),
+            ],
+            options={
+                'verbose_name': 'Счетчик изменений',
+                'verbose_name_plural': 'Счетчик изменений',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50, verbose_name='Модель')),
+                ('object_id', models.BigIntegerField(verbose_name='Ключ записи')),
+                ('change_seq', models.BigIntegerField(db_index=True, verbose_name='Номер изменения')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удаленная запись',
+                'verbose_name_plural': 'Удаленные записи',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='change_seq',
+            field=exhibits.models.ChangeSeqField(db_index=True, default=0, editable=False, verbose_name='Номер изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderworkjournal',
+            name='change_seq',
+            field=exhibits.models.ChangeSeqField(db_index=True, default=0, editable=False, verbose_name='Номер изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='worker',
+            name='change_seq',
+            field=exhibits.models.ChangeSeqField(db_index=True, default=0, editable=False, verbose_name='Номер изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='workshop',
+            name='change_seq',
+            field=exhibits.models.ChangeSeqField(db_index=True, default=0, editable=False, verbose_name='Номер изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exhibits', '0012_change_sequence'),
+    ]
+
+    operations = [
+        # Одиночные индексы по внешним ключам заменены составными. AlterField
+        # в SQLite пересоздал бы таблицы заказов и журнала целиком, поэтому
+        # в базе удаляется только сам индекс.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "exhibits_order_furniture_type_id_1074d05a"',
+                    'CREATE INDEX "exhibits_order_furniture_type_id_1074d05a" '
+                    'ON "exhibits_order" ("furniture_type_id")'
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "exhibits_orderworkjournal_workshop_id_c5e03b2a"',
+                    'CREATE INDEX "exhibits_orderworkjournal_workshop_id_c5e03b2a" '
+                    'ON "exhibits_orderworkjournal" ("workshop_id")'
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='order',
+                    name='furniture_type',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='exhibits.furnituretype', verbose_name='Тип мебели'),
+                ),
+                migrations.AlterField(
+                    model_name='orderworkjournal',
+                    name='workshop',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='work_journal', to='exhibits.workshop', verbose_name='Цех'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['furniture_type', '-created_at', '-id'], name='order_ftype_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderworkjournal',
+            index=models.Index(fields=['-start_time', '-id'], name='journal_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderworkjournal',
+            index=models.Index(fields=['workshop', '-start_time', '-id'], name='journal_workshop_start_idx'),
+        ),
+    ]
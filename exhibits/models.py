@@ -1,12 +1,136 @@
-from django.db import models
+import re
+
+from django.db import connections, models, router, transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+
+from .storage import photo_storage
 
 User = get_user_model()
 
 
-class ActiveManager(models.Manager):
+# Статусы, в которых заказ может оказаться просроченным.
+OPEN_STATUSES = ('new', 'in_progress')
+# Разрешенные переходы: новый статус -> статусы, из которых в него переводят.
+STATUS_TRANSITIONS = {
+    'in_progress': ('new',),
+    'completed': ('new', 'in_progress'),
+    'cancelled': ('new', 'in_progress'),
+}
+
+# Отправляется после OrderQuerySet.transition() с аргументами status
+# (новый статус) и changes ({прежний статус: номер изменения}).
+status_changed = Signal()
+
+
+class OrderQuerySet(models.QuerySet):
+    """Набор заказов с операциями над денормализованными счетчиками."""
+
+    def _overdue_condition(self, today=None):
+        return models.Q(
+            status__in=OPEN_STATUSES,
+            deadline__lt=today or timezone.now().date()
+        )
+
+    def overdue(self, today=None):
+        """Просроченные заказы: один запрос по индексу (status, deadline)."""
+        return self.filter(self._overdue_condition(today))
+
+    def not_overdue(self, today=None):
+        return self.exclude(self._overdue_condition(today))
+
+    def with_overdue(self, today=None):
+        """Добавляет признак overdue, вычисленный в базе данных."""
+        return self.annotate(overdue=models.Case(
+            models.When(self._overdue_condition(today), then=True),
+            default=False,
+            output_field=models.BooleanField()
+        ))
+
+    def refresh_counters(self):
+        """
+        Пересчитывает workshop_count и last_journal_at одним UPDATE.
+        Меняются только строки, где счетчики разошлись: у остальных не
+        растет номер изменения, и синхронизация не отдает их заново.
+        Возвращает количество исправленных заказов.
+        """
+        workshop_count = Coalesce(models.Subquery(
+            self.model.workshops.through.objects.filter(
+                order_id=models.OuterRef('pk')
+            ).order_by().values('order_id').annotate(
+                count=models.Count('*')
+            ).values('count')
+        ), 0)
+        last_journal_at = models.Subquery(
+            OrderWorkJournal.objects.filter(
+                order_id=models.OuterRef('pk')
+            ).order_by().values('order_id').annotate(
+                last=models.Max('start_time')
+            ).values('last')
+        )
+        stale = self.alias(
+            new_workshop_count=workshop_count,
+            new_last_journal_at=last_journal_at
+        ).filter(
+            ~models.Q(workshop_count=models.F('new_workshop_count')) |
+            models.Q(last_journal_at__isnull=True, new_last_journal_at__isnull=False) |
+            models.Q(last_journal_at__isnull=False, new_last_journal_at__isnull=True) |
+            models.Q(
+                ~models.Q(last_journal_at=models.F('new_last_journal_at')),
+                last_journal_at__isnull=False,
+                new_last_journal_at__isnull=False
+            )
+        )
+        with transaction.atomic(using=self.db, savepoint=False):
+            return stale.update(
+                workshop_count=workshop_count,
+                last_journal_at=last_journal_at,
+                updated_at=timezone.now(),
+                change_seq=ChangeSequence.objects.allocate()
+            )
+
+    def transition(self, status):
+        """
+        Переводит заказы в статус status и возвращает их количество.
+
+        Меняются только заказы в статусах, разрешенных STATUS_TRANSITIONS,
+        и только статус, дата выполнения и отметки изменения: условие на
+        статус стоит в самом UPDATE, а правки других полей, сделанные
+        параллельно, не перезаписываются. Версия растет, поэтому открытая
+        форма редактирования заказа сообщит о конфликте.
+
+        На каждый прежний статус - один UPDATE со своим номером изменения:
+        по нему обработчики status_changed находят переведенные заказы
+        без списков ключей.
+        """
+        if status not in STATUS_TRANSITIONS:
+            raise ValueError(f'Перевод заказов в статус «{status}» не предусмотрен.')
+        now = timezone.now()
+        values = {
+            'status': status,
+            'updated_at': now,
+            'version': models.F('version') + 1,
+        }
+        if status == 'completed':
+            values['completion_date'] = now.date()
+        changes = {}
+        total = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            for old_status in STATUS_TRANSITIONS[status]:
+                change_seq = ChangeSequence.objects.allocate()
+                updated = self.filter(status=old_status).update(change_seq=change_seq, **values)
+                if updated:
+                    changes[old_status] = change_seq
+                    total += updated
+            if changes:
+                status_changed.send(sender=self.model, status=status, changes=changes)
+        return total
+
+
+class ActiveManager(models.Manager.from_queryset(OrderQuerySet)):
     """Менеджер для получения активных заказов."""
     
     def get_queryset(self):
@@ -36,6 +160,183 @@ class BaseModel(models.Model):
         ordering = ('title',)
 
 
+class ChangeSequenceQuerySet(models.QuerySet):
+
+    def allocate(self, count=1):
+        """
+        Занимает count номеров изменений и возвращает последний из них.
+        Вызывается в той же транзакции, что и запись изменения: счетчик
+        блокирует запись до ее конца, поэтому номера фиксируются по
+        порядку и клиент с отметкой N не пропустит изменение меньше N.
+        Строку счетчика создает первый вызов, если ее нет (например,
+        после flush).
+        """
+        connection = connections[router.db_for_write(self.model)]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (id, value, horizon) VALUES (1, %s, 0) '
+                f'ON CONFLICT (id) DO UPDATE SET value = {table}.value + excluded.value '
+                f'RETURNING value',
+                [count]
+            )
+            return cursor.fetchone()[0]
+
+    def assign(self, objects):
+        """Номера изменений для пачки объектов перед bulk_create."""
+        objects = list(objects)
+        if objects:
+            last = self.allocate(len(objects))
+            for number, obj in enumerate(objects, last - len(objects) + 1):
+                obj.change_seq = number
+        return objects
+
+
+class ChangeSequence(models.Model):
+    """
+    Счетчик изменений для синхронизации планшетов (единственная строка).
+    horizon - номер, до которого удаленные записи уже забыты: клиент
+    с более старой отметкой должен загрузить данные заново.
+    """
+
+    value = models.BigIntegerField('Последний номер', default=0)
+    horizon = models.BigIntegerField('Граница удаленных', default=0)
+
+    objects = ChangeSequenceQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Счетчик изменений'
+        verbose_name_plural = 'Счетчик изменений'
+
+    def __str__(self):
+        return f'Изменение {self.value}'
+
+
+class ChangeSeqField(models.BigIntegerField):
+    """Номер изменения: новый при каждом сохранении строки."""
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        # Номер, назначенный заранее через assign(), сохраняется при вставке.
+        if not add or value is None:
+            value = ChangeSequence.objects.allocate()
+            setattr(model_instance, self.attname, value)
+        return value
+
+
+class Tombstone(models.Model):
+    """Удаленная запись, о которой синхронизация сообщит клиентам."""
+
+    model = models.CharField('Модель', max_length=50)
+    object_id = models.BigIntegerField('Ключ записи')
+    change_seq = models.BigIntegerField('Номер изменения', db_index=True)
+    deleted_at = models.DateTimeField('Дата удаления', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Удаленная запись'
+        verbose_name_plural = 'Удаленные записи'
+
+    def __str__(self):
+        return f'{self.model} #{self.object_id}'
+
+
+class EditConflict(Exception):
+    """Запись изменили после того, как ее прочитали для правки."""
+
+
+class TrackedModel(models.Model):
+    """
+    Абстрактная модель с временем последнего изменения строки, по
+    которому API отвечает клиентам, не изменились ли данные, и версией
+    для правки без потери чужих изменений.
+
+    change_seq - номер последнего изменения строки для синхронизации
+    (см. ChangeSequence).
+
+    Каждое сохранение увеличивает version выражением F() в самом UPDATE.
+    Если перед сохранением задать expected_version (версию, которую видел
+    пользователь), сначала выполняется UPDATE с условием version =
+    expected_version: при несовпадении он не меняет строк и save()
+    вызывает EditConflict, а при совпадении блокирует строку до конца
+    транзакции, так что между проверкой и записью ее никто не изменит.
+    Массовые UPDATE счетчиков версию не меняют: пользователь эти поля
+    не правит.
+    """
+
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False
+    )
+    change_seq = ChangeSeqField(
+        'Номер изменения',
+        db_index=True,
+        editable=False
+    )
+
+    expected_version = None
+
+    class Meta:
+        abstract = True
+
+    def prepare_save(self, update_fields):
+        """
+        Подготовка перед записью внутри транзакции save(): при конфликте
+        версий созданное здесь откатывается вместе с записью. Возвращает
+        update_fields для save().
+        """
+        return update_fields
+
+    def _check_version(self, using, expected):
+        updated = type(self)._base_manager.using(using).filter(
+            pk=self.pk, version=expected
+        ).update(version=models.F('version') + 1)
+        if not updated:
+            raise EditConflict
+        self.version = expected + 1
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        expected = self.expected_version
+        adding = self._state.adding
+        loaded_version = self.__dict__.get('version')
+        saved = False
+        # Номер изменения и сама запись - в одной транзакции. Ошибка
+        # внутри save() помечает внешнюю транзакцию для отката; точка
+        # сохранения при проверке версии оставляет ее пригодной для
+        # показа формы с конфликтом.
+        try:
+            with transaction.atomic(using=using, savepoint=expected is not None):
+                if not adding:
+                    if expected is not None:
+                        self._check_version(using, expected)
+                    else:
+                        self.version = models.F('version') + 1
+                update_fields = self.prepare_save(kwargs.get('update_fields'))
+                # auto_now срабатывает и при update_fields, но без поля
+                # в списке новое значение не было бы записано.
+                if update_fields is not None:
+                    kwargs['update_fields'] = {
+                        *update_fields, 'updated_at', 'version', 'change_seq'
+                    }
+                super().save(*args, **kwargs)
+                saved = True
+        finally:
+            self.expected_version = None
+            if not adding and (not saved or expected is None):
+                # Выражение F() в экземпляре заменяется числом; версия,
+                # которую не читали, остается отложенной.
+                if loaded_version is None:
+                    self.__dict__.pop('version', None)
+                else:
+                    self.version = loaded_version + (1 if saved else 0)
+
+
 class FurnitureType(BaseModel):
     """Модель типа мебели."""
     
@@ -62,7 +363,7 @@ class FurnitureType(BaseModel):
         return f'{self.title} ({self.get_category_display()})'
 
 
-class Workshop(BaseModel):
+class Workshop(BaseModel, TrackedModel):
     """Модель цеха."""
     
     workshop_number = models.PositiveSmallIntegerField(
@@ -86,7 +387,7 @@ class Workshop(BaseModel):
         return f'Цех {self.workshop_number}: {self.title}'
 
 
-class Worker(models.Model):
+class Worker(TrackedModel):
     """Модель рабочего."""
     
     first_name = models.CharField(
@@ -129,7 +430,107 @@ class Worker(models.Model):
         return f'{self.last_name} {self.first_name} {self.patronymic}'
 
 
-class Order(BaseModel):
+NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def normalize_phone(phone):
+    """
+    Ключ телефона для поиска заказчика: только цифры, российские номера
+    приводятся к виду 7XXXXXXXXXX. Пустая строка, если цифр нет.
+    """
+    digits = NON_DIGITS.sub('', phone or '')
+    if len(digits) == 11 and digits[0] == '8':
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    return digits
+
+
+class CustomerQuerySet(models.QuerySet):
+
+    def for_phone(self, name, phone):
+        """Заказчик с этим телефоном; создается, если его еще нет."""
+        key = normalize_phone(phone)
+        if not key:
+            return None
+        customer, _ = self.get_or_create(
+            phone_key=key,
+            defaults={'name': name, 'phone': phone}
+        )
+        return customer
+
+    def assign(self, orders):
+        """
+        Проставляет заказчиков пачке заказов без сохранения самих заказов:
+        один запрос на поиск и по одному на создание и чтение новых.
+        """
+        keys = {}
+        for order in orders:
+            key = normalize_phone(order.customer_phone)
+            if key:
+                keys.setdefault(key, order)
+        customers = dict(
+            self.filter(phone_key__in=keys).values_list('phone_key', 'pk')
+        )
+        missing = [key for key in keys if key not in customers]
+        if missing:
+            # Заказчика мог успеть создать параллельный запрос.
+            self.bulk_create(
+                (
+                    Customer(
+                        name=keys[key].customer_name,
+                        phone=keys[key].customer_phone,
+                        phone_key=key
+                    )
+                    for key in missing
+                ),
+                ignore_conflicts=True
+            )
+            customers.update(
+                self.filter(phone_key__in=missing).values_list('phone_key', 'pk')
+            )
+        for order in orders:
+            order.customer_id = customers.get(normalize_phone(order.customer_phone))
+
+
+class Customer(models.Model):
+    """Модель заказчика; заказы связываются с ним по номеру телефона."""
+
+    name = models.CharField(
+        'Имя',
+        max_length=200
+    )
+    phone = models.CharField(
+        'Телефон',
+        max_length=20
+    )
+    phone_key = models.CharField(
+        'Нормализованный телефон',
+        max_length=20,
+        unique=True,
+        editable=False
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True
+    )
+
+    objects = CustomerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Заказчик'
+        verbose_name_plural = 'Заказчики'
+        ordering = ('name',)
+
+    def __str__(self):
+        return f'{self.name} ({self.phone})'
+
+    def save(self, *args, **kwargs):
+        self.phone_key = normalize_phone(self.phone)
+        super().save(*args, **kwargs)
+
+
+class Order(BaseModel, TrackedModel):
     """Модель заказа."""
     
     STATUS_CHOICES = [
@@ -154,9 +555,22 @@ class Order(BaseModel):
         'Телефон заказчика',
         max_length=20
     )
+    # Индекс по заказчику - составной order_customer_created_idx.
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=False,
+        related_name='orders',
+        verbose_name='Заказчик'
+    )
+    # Индексы по типу мебели - составные order_ftype_*.
     furniture_type = models.ForeignKey(
         FurnitureType,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='orders',
         verbose_name='Тип мебели'
     )
@@ -197,33 +611,106 @@ class Order(BaseModel):
         'Примечания',
         blank=True
     )
+    workshop_count = models.PositiveIntegerField(
+        'Количество цехов',
+        default=0,
+        editable=False
+    )
+    last_journal_at = models.DateTimeField(
+        'Последняя запись в журнале',
+        null=True,
+        blank=True,
+        editable=False
+    )
     
-    objects = models.Manager()
+    # Счетчики пишет только refresh_counters(): в экземпляре они могут
+    # устареть, и полное сохранение не должно возвращать старые значения.
+    COUNTER_FIELDS = ('workshop_count', 'last_journal_at')
+
+    objects = OrderQuerySet.as_manager()
     active = ActiveManager()
     
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ('-created_at',)
+        indexes = (
+            # Сортировка по умолчанию; id - для однозначного порядка в админке.
+            models.Index(
+                fields=('-created_at', '-id'),
+                name='order_created_idx'
+            ),
+            models.Index(
+                fields=('status', '-created_at'),
+                name='order_status_created_idx'
+            ),
+            models.Index(
+                fields=('furniture_type', 'status', '-created_at'),
+                name='order_ftype_status_idx'
+            ),
+            models.Index(
+                fields=('furniture_type', '-created_at', '-id'),
+                name='order_ftype_created_idx'
+            ),
+            models.Index(
+                fields=('status', 'deadline'),
+                name='order_status_deadline_idx'
+            ),
+            models.Index(
+                fields=('customer', '-created_at', '-id'),
+                name='order_customer_created_idx'
+            ),
+        )
     
     def __str__(self):
         return f'Заказ #{self.id}: {self.title}'
+
+    def prepare_save(self, update_fields):
+        # Заказчик ищется только у нового заказа и при смене телефона.
+        # Это происходит внутри транзакции save(): при конфликте версий
+        # созданный заказчик не остается в базе.
+        phone_changed = 'customer_phone' not in self.get_deferred_fields() and (
+            self.pk is None or self.customer_phone != getattr(self, '_loaded_phone', None)
+        )
+        if phone_changed:
+            self.customer = Customer.objects.for_phone(self.customer_name, self.customer_phone)
+            if update_fields is not None:
+                update_fields = {*update_fields, 'customer'}
+            self._loaded_phone = self.customer_phone
+        if not self._state.adding and update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        return update_fields
     
     def is_overdue(self):
         """Проверяет, просрочен ли заказ."""
+        if hasattr(self, 'overdue'):
+            return self.overdue
         return (
-            self.status in ['new', 'in_progress'] and
+            self.status in OPEN_STATUSES and
             self.deadline < timezone.now().date()
         )
     
     def mark_completed(self):
-        """Отмечает заказ как выполненный."""
-        self.status = 'completed'
-        self.completion_date = timezone.now().date()
-        self.save()
+        """
+        Отмечает заказ как выполненный, не перезаписывая остальные поля.
+        Возвращает False, если из текущего статуса завершать нельзя.
+        """
+        if not Order.objects.filter(pk=self.pk).transition('completed'):
+            return False
+        self.refresh_from_db(
+            fields=('status', 'completion_date', 'updated_at', 'version', 'change_seq')
+        )
+        self._loaded_status = self.status
+        return True
 
 
-class OrderWorkJournal(models.Model):
+class OrderWorkJournal(TrackedModel):
     """Модель журнала работы над заказами."""
     
     order = models.ForeignKey(
@@ -232,9 +719,11 @@ class OrderWorkJournal(models.Model):
         related_name='work_journal',
         verbose_name='Заказ'
     )
+    # Индексы по цеху - составные journal_workshop_*.
     workshop = models.ForeignKey(
         Workshop,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='work_journal',
         verbose_name='Цех'
     )
@@ -256,14 +745,210 @@ class OrderWorkJournal(models.Model):
         'Описание выполненных работ',
         blank=True
     )
+    work_date = models.DateField(
+        'Дата работы',
+        null=True,
+        editable=False
+    )
+    duration = models.DurationField(
+        'Длительность',
+        null=True,
+        editable=False
+    )
+    labor = models.DurationField(
+        'Трудозатраты',
+        null=True,
+        editable=False,
+        help_text='Длительность, умноженная на количество рабочих'
+    )
     
     class Meta:
         verbose_name = 'Запись журнала работы'
         verbose_name_plural = 'Журнал работы'
         ordering = ('-start_time',)
+        indexes = (
+            models.Index(
+                fields=('-start_time', '-id'),
+                name='journal_start_idx'
+            ),
+            models.Index(
+                fields=('workshop', '-start_time', '-id'),
+                name='journal_workshop_start_idx'
+            ),
+            models.Index(
+                fields=('workshop', 'end_time', 'work_date', 'labor'),
+                name='journal_workshop_end_idx'
+            ),
+            models.Index(
+                fields=('work_date', 'workshop', 'order', 'labor'),
+                name='journal_work_date_idx'
+            ),
+        )
     
     def __str__(self):
         return f'{self.order.title} - {self.workshop.title}'
+    
+    def fill_labor_fields(self):
+        """
+        Заполняет дату и длительность работы для отчетов.
+        Длительность незакрытой записи не определена. Трудозатраты
+        зависят от рабочих и пересчитываются после сохранения связей.
+        """
+        self.work_date = timezone.localdate(self.start_time) if self.start_time else None
+        if self.start_time and self.end_time:
+            self.duration = self.end_time - self.start_time
+        else:
+            self.duration = None
+    
+    def save(self, *args, **kwargs):
+        self.fill_labor_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'work_date', 'duration'}
+        super().save(*args, **kwargs)
+
+
+class WorkerLabor(models.Model):
+    """Трудозатраты рабочего за день, обновляемые при изменениях журнала."""
+    
+    worker = models.ForeignKey(
+        Worker,
+        on_delete=models.CASCADE,
+        related_name='labor',
+        verbose_name='Рабочий'
+    )
+    work_date = models.DateField('Дата работы')
+    duration = models.DurationField('Отработано')
+    entries = models.PositiveIntegerField(
+        'Записей журнала',
+        default=0
+    )
+    
+    class Meta:
+        verbose_name = 'Трудозатраты рабочего'
+        verbose_name_plural = 'Трудозатраты рабочих'
+        ordering = ('-work_date',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('worker', 'work_date'),
+                name='worker_labor_unique'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('work_date', 'worker', 'duration', 'entries'),
+                name='worker_labor_date_idx'
+            ),
+        )
+    
+    def __str__(self):
+        return f'{self.worker} - {self.work_date}'
+
+
+class WorkshopStats(models.Model):
+    """Сводные показатели загрузки цеха, обновляемые при изменениях."""
+    
+    workshop = models.OneToOneField(
+        Workshop,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Цех'
+    )
+    worker_count = models.PositiveIntegerField(
+        'Рабочих',
+        default=0
+    )
+    active_orders = models.PositiveIntegerField(
+        'Заказов в работе',
+        default=0
+    )
+    active_low = models.PositiveIntegerField(
+        'В работе с низким приоритетом',
+        default=0
+    )
+    active_medium = models.PositiveIntegerField(
+        'В работе со средним приоритетом',
+        default=0
+    )
+    active_high = models.PositiveIntegerField(
+        'В работе с высоким приоритетом',
+        default=0
+    )
+    active_urgent = models.PositiveIntegerField(
+        'Срочных в работе',
+        default=0
+    )
+    open_journal_entries = models.PositiveIntegerField(
+        'Незакрытых записей журнала',
+        default=0
+    )
+    busy_workers = models.PositiveIntegerField(
+        'Рабочих занято сейчас',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        'Дата обновления',
+        auto_now=True
+    )
+    
+    class Meta:
+        verbose_name = 'Показатели цеха'
+        verbose_name_plural = 'Показатели цехов'
+    
+    def __str__(self):
+        return f'Показатели: {self.workshop}'
+
+
+class PhotoBlobQuerySet(models.QuerySet):
+
+    def acquire(self, name):
+        """Добавляет ссылку на файл; строка блокируется до конца транзакции."""
+        while not self.filter(name=name).update(ref_count=models.F('ref_count') + 1):
+            # Строку могут удалить между поиском и обновлением.
+            _, created = self.get_or_create(name=name, defaults={'ref_count': 1})
+            if created:
+                return
+
+    def release(self, name):
+        """
+        Убирает ссылку на файл. Возвращает True, если ссылок больше нет
+        и файл можно удалить через delete_unused().
+        """
+        self.filter(name=name, ref_count__gt=0).update(ref_count=models.F('ref_count') - 1)
+        return self.filter(name=name, ref_count=0).exists()
+
+    def delete_unused(self, name):
+        """
+        Удаляет строку файла без ссылок; True, если она удалена и файл
+        нужно удалить в той же транзакции. Загрузка того же файла берет
+        ссылку до проверки файла (ContentAddressedStorage._save()) и
+        ждет конца этой транзакции, а затем записывает файл заново.
+        """
+        return self.filter(name=name, ref_count=0).delete()[0] > 0
+
+
+class PhotoBlob(models.Model):
+    """Файл хранилища фотографий и количество фотографий, которые его используют."""
+
+    name = models.CharField(
+        'Файл',
+        max_length=255,
+        unique=True
+    )
+    ref_count = models.PositiveIntegerField(
+        'Ссылок',
+        default=0
+    )
+
+    objects = PhotoBlobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Файл фотографии'
+        verbose_name_plural = 'Файлы фотографий'
+
+    def __str__(self):
+        return self.name
 
 
 class OrderPhoto(models.Model):
@@ -277,7 +962,16 @@ class OrderPhoto(models.Model):
     )
     image = models.ImageField(
         'Изображение',
-        upload_to='orders/photos/'
+        upload_to='orders/photos/',
+        storage=photo_storage,
+        db_index=True
+    )
+    # Ширина готовых уменьшенных копий и оригинала, см. exhibits.thumbnails.
+    renditions = models.JSONField(
+        'Уменьшенные копии',
+        default=dict,
+        blank=True,
+        editable=False
     )
     description = models.CharField(
         'Описание',
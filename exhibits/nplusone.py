@@ -0,0 +1,138 @@
+"""
+Обнаружение N+1 запросов.
+
+Запросы одного HTTP-запроса группируются по нормализованному тексту SQL.
+Если запрос одной формы выполнен больше порога раз, это почти всегда
+обращение к связанному объекту в цикле без select_related/prefetch_related.
+"""
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+THIS_FILE = Path(__file__).resolve()
+
+
+class NPlusOneError(Exception):
+    """Повторяющиеся запросы одной формы превысили порог."""
+
+
+def normalize_sql(sql):
+    """Текст запроса без значений: одинаковая форма дает одинаковую строку."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = STRING.sub('?', sql)
+    return NUMBER.sub('?', sql)
+
+
+def _project_frame():
+    """Ближайшее к запросу место в коде проекта, а не Django."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for frame in reversed(traceback.extract_stack()):
+        path = Path(frame.filename).resolve()
+        if path == THIS_FILE or base_dir not in path.parents:
+            continue
+        if 'site-packages' in path.parts:
+            continue
+        return f'{path.relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class QueryCollector:
+    """Обертка выполнения SQL, считающая запросы по их форме."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = normalize_sql(sql)
+        self.counts[shape] += 1
+        if shape not in self.locations:
+            self.locations[shape] = _project_frame()
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """Формы запросов, выполненные больше threshold раз."""
+        return [
+            (shape, count, self.locations[shape])
+            for shape, count in self.counts.most_common()
+            if count > threshold
+        ]
+
+
+@contextmanager
+def collect_queries(collector):
+    """
+    Передает collector запросы ко всем базам: страницы читают и
+    с реплик (exhibits.replicas), а не только с default.
+    """
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(collector))
+        yield collector
+
+
+def format_report(view_name, repeated):
+    lines = [f'Возможный N+1 в {view_name}:']
+    for shape, count, location in repeated:
+        lines.append(f'  {count} x {shape}')
+        if location:
+            lines.append(f'    вызвано из {location}')
+    return '\n'.join(lines)
+
+
+class NPlusOneMiddleware:
+    """
+    Сообщает о повторяющихся запросах в журнал или, если
+    NPLUSONE_RAISE включен (например, в тестах), вызывает NPlusOneError.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        self.raise_errors = getattr(settings, 'NPLUSONE_RAISE', False)
+
+    def __call__(self, request):
+        with collect_queries(QueryCollector()) as collector:
+            response = self.get_response(request)
+
+        repeated = collector.repeated(self.threshold)
+        if repeated:
+            match = request.resolver_match
+            view_name = match.view_name if match else request.path
+            report = format_report(view_name, repeated)
+            if self.raise_errors:
+                raise NPlusOneError(report)
+            logger.warning(report)
+        return response
+
+
+@contextmanager
+def assert_no_nplusone(threshold=None, label='блок кода'):
+    """
+    Проверка для тестов: вызывает AssertionError, если внутри блока
+    запрос одной формы выполнен больше порога раз.
+
+        with assert_no_nplusone():
+            self.client.get(reverse('exhibits:index'))
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+    with collect_queries(QueryCollector()) as collector:
+        yield collector
+    repeated = collector.repeated(threshold)
+    if repeated:
+        raise AssertionError(format_report(label, repeated))
@@ -0,0 +1,222 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    """Страница, полученная по курсору, а не по номеру."""
+
+    keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Пагинатор по ключу сортировки.
+
+    Вместо OFFSET каждая страница начинается с условия
+    «строго после (или до) последней показанной записи», поэтому
+    стоимость запроса не зависит от глубины страницы. Сортировка
+    задается полями ordering, последнее из которых должно быть
+    уникальным (обычно id).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'),
+                 count=True):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self.with_count = count
+
+    @cached_property
+    def count(self):
+        """Общее число записей или None, если подсчет отключен."""
+        if not self.with_count:
+            return None
+        return self.queryset.order_by().count()
+
+    def _fields(self):
+        return [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj):
+        values = []
+        for name, _ in self._fields():
+            value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        data = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor):
+        """Возвращает значения полей курсора или None для неверного курсора."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            fields = self._fields()
+            if len(values) != len(fields):
+                return None
+            return [
+                self.queryset.model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, backwards):
+        """Условие «после курсора» в порядке сортировки (или до него)."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        # Из одного OR SQLite не выводит границу индекса и сканирует его
+        # с начала. Нестрогое условие на первое поле дает поиск по индексу.
+        (name, descending), value = self._fields()[0], values[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{name}__{lookup}': value}) & condition
+
+    def _reverse_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def _before_queryset(self, before_values):
+        return self.queryset.filter(
+            self._seek(before_values, True)
+        ).order_by(*self._reverse_ordering())[:self.per_page + 1]
+
+    def _after_queryset(self, after_values):
+        queryset = self.queryset
+        if after_values is not None:
+            queryset = queryset.filter(self._seek(after_values, False))
+        return queryset[:self.per_page + 1]
+
+    def _make_page(self, object_list, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if object_list:
+            if has_next:
+                next_cursor = self.encode_cursor(object_list[-1])
+            if has_previous:
+                previous_cursor = self.encode_cursor(object_list[0])
+        return KeysetPage(object_list, self, next_cursor, previous_cursor)
+
+    def get_page(self, after=None, before=None):
+        """
+        Страница после курсора after или перед курсором before.
+        Без курсоров (или с неверным курсором) - первая страница.
+        """
+        after_values = self.decode_cursor(after) if after else None
+        before_values = self.decode_cursor(before) if before else None
+
+        if before_values is not None:
+            rows = list(self._before_queryset(before_values))
+            object_list = rows[:self.per_page][::-1]
+            if object_list:
+                return self._make_page(object_list, True, len(rows) > self.per_page)
+        rows = list(self._after_queryset(after_values))
+        return self._make_page(
+            rows[:self.per_page], len(rows) > self.per_page, after_values is not None
+        )
+
+    async def aget_page(self, after=None, before=None):
+        """Асинхронная версия get_page(); подсчет записей не поддерживается."""
+        after_values = self.decode_cursor(after) if after else None
+        before_values = self.decode_cursor(before) if before else None
+
+        if before_values is not None:
+            rows = [row async for row in self._before_queryset(before_values)]
+            object_list = rows[:self.per_page][::-1]
+            if object_list:
+                return self._make_page(object_list, True, len(rows) > self.per_page)
+        rows = [row async for row in self._after_queryset(after_values)]
+        return self._make_page(
+            rows[:self.per_page], len(rows) > self.per_page, after_values is not None
+        )
+
+
+def estimated_count(model, using):
+    """
+    Число строк таблицы по статистике SQLite (sqlite_stat1, ее собирают
+    ANALYZE и PRAGMA optimize) или None, если статистики нет.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        # Первое число строки статистики - количество строк таблицы.
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки для больших таблиц.
+
+    Без фильтров число записей берется из статистики базы, с фильтрами
+    записи считаются не дальше COUNT_LIMIT. Оба числа - только нижние
+    границы: статистика устаревает, а подсчет обрезан. Пока запрошенная
+    страница далеко от границы, их хватает для ссылок на страницы; ближе
+    к ней записи считаются точно, чтобы ни одна не оказалась за
+    последней страницей.
+    """
+
+    COUNT_LIMIT = 10000
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, page_number=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        try:
+            self.page_number = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            self.page_number = 1
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        if not queryset.query.where:
+            bound = estimated_count(queryset.model, queryset.db)
+        else:
+            bound = queryset[:self.COUNT_LIMIT].count()
+            if bound < self.COUNT_LIMIT:
+                return bound
+        # Граница должна оставлять за запрошенной страницей еще одну.
+        if bound is not None and bound > (self.page_number + 1) * self.per_page:
+            return bound
+        return queryset.count()
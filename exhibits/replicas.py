@@ -0,0 +1,134 @@
+"""
+Чтение с реплик базы данных.
+
+Страницы приложений из DATABASE_REPLICA_APPS читают данные с одной из
+реплик DATABASE_REPLICAS, выбранной на весь запрос; запись всегда идет
+в основную базу. Код вне HTTP-запросов (команды, сигналы в потоках)
+читает основную базу: он часто читает и тут же пишет.
+
+Реплика отстает от основной базы. Чтобы пользователь видел собственные
+изменения (например, заказ сразу после его создания), запрос, который
+что-то записал, ставит cookie, и следующие REPLICA_PIN_SECONDS секунд
+этот браузер читает основную базу. Запросы, изменяющие данные (POST
+и т. п.), и чтение внутри транзакции тоже идут в основную базу.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Сессии меняются при входе и почти при каждом действии: с отстающей
+# реплики пользователь только что вошедшим не выглядел бы.
+PRIMARY_APPS = {'sessions'}
+
+_state = ContextVar('replica_state', default=None)
+
+
+class RoutingState:
+    """Решение о чтении для текущего запроса."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = random.choice(settings.DATABASE_REPLICAS)
+        self.pinned = request.method not in SAFE_METHODS or is_pinned(request)
+        self.written = False
+
+    def read_alias(self, model):
+        if model._meta.app_label in PRIMARY_APPS or self.pinned:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        match = self.request.resolver_match
+        if match is None:
+            return DEFAULT_DB_ALIAS
+        app = match.func.__module__.partition('.')[0]
+        if app not in getattr(settings, 'DATABASE_REPLICA_APPS', ()):
+            return DEFAULT_DB_ALIAS
+        return self.replica
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRouter:
+    """Роутер: чтение по решению RoutingState, запись в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return DEFAULT_DB_ALIAS
+        return state.read_alias(model)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Дальнейшее чтение в этом запросе и следующих - из основной базы.
+            state.written = state.pinned = True
+        # Без явного ответа Django запишет объект в базу, из которой
+        # он прочитан, то есть в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """Хранит RoutingState на время запроса и ставит cookie после записи."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # Асинхронный ORM выполняет запросы в потоке с копией контекста,
+        # поэтому роутер видит тот же объект RoutingState.
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.written:
+            seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
@@ -0,0 +1,187 @@
+"""
+Отчеты по трудозатратам на основе журнала работ.
+
+Трудозатраты считаются в человеко-часах: длительность записи журнала
+засчитывается каждому рабочему записи, незакрытые записи не учитываются.
+
+Соединение журнала с промежуточной таблицей рабочих на миллионах строк
+слишком медленное для отчета, поэтому в базе хранятся готовые значения:
+у записи журнала - дата работы, длительность и трудозатраты
+(длительность на количество рабочих), а в WorkerLabor - суммы по рабочему
+за день. Отчеты только суммируют их по индексам; при изменениях журнала
+пересчитываются лишь затронутые записи и дни.
+"""
+from django.db import transaction
+from django.db.models import (
+    Count, DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+)
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ChangeSequence, Order, OrderWorkJournal, Worker, WorkerLabor, Workshop
+
+JournalWorkers = OrderWorkJournal.workers.through
+
+# Группировка: поле ключа, модель и поля подписи. Рабочие берутся
+# из WorkerLabor, остальное - из записей журнала. Подписи читаются
+# отдельным запросом, чтобы группировка шла только по индексу.
+GROUPS = {
+    'worker': {
+        'title': 'По рабочим',
+        'key': 'worker_id',
+        'model': Worker,
+        'label': ('last_name', 'first_name', 'patronymic'),
+    },
+    'workshop': {
+        'title': 'По цехам',
+        'key': 'workshop_id',
+        'model': Workshop,
+        'label': ('workshop_number', 'title'),
+    },
+    'order': {
+        'title': 'По заказам',
+        'key': 'order_id',
+        'model': Order,
+        'label': ('title',),
+    },
+    'day': {
+        'title': 'По дням',
+        'key': 'work_date',
+        'model': None,
+        'label': (),
+    },
+}
+GROUP_CHOICES = [(name, group['title']) for name, group in GROUPS.items()]
+
+
+def _clean(ids):
+    return {pk for pk in ids if pk is not None}
+
+
+def _labels(config, keys):
+    if config['model'] is None:
+        return {}
+    rows = config['model'].objects.filter(pk__in=keys).values_list('pk', *config['label'])
+    return {
+        pk: ' '.join(str(value) for value in values if value)
+        for pk, *values in rows
+    }
+
+
+def labor_hours(group, date_from=None, date_to=None, limit=None):
+    """
+    Человеко-часы, сгруппированные по group (worker, workshop, order, day).
+    date_from и date_to - даты работы включительно.
+    Возвращает список словарей с ключами key, label, hours, entries.
+    """
+    config = GROUPS[group]
+    if group == 'worker':
+        rows = WorkerLabor.objects.all()
+        total, entries = Sum('duration'), Sum('entries')
+    else:
+        # Условие на work_date направляет запрос в покрывающий индекс.
+        rows = OrderWorkJournal.objects.filter(work_date__isnull=False, labor__isnull=False)
+        total, entries = Sum('labor'), Count('*')
+    if date_from:
+        rows = rows.filter(work_date__gte=date_from)
+    if date_to:
+        rows = rows.filter(work_date__lte=date_to)
+
+    rows = rows.values(config['key']).annotate(total=total, entries=entries)
+    rows = rows.order_by(config['key']) if group == 'day' else rows.order_by('-total')
+    if limit:
+        rows = rows[:limit]
+    rows = list(rows)
+    labels = _labels(config, [row[config['key']] for row in rows])
+
+    return [
+        {
+            'key': row[config['key']],
+            'label': labels.get(row[config['key']]) or str(row[config['key']]),
+            'hours': round(row['total'].total_seconds() / 3600, 2) if row['total'] else 0,
+            'entries': row['entries'],
+        }
+        for row in rows
+    ]
+
+
+def _labor_expression():
+    worker_count = JournalWorkers.objects.filter(
+        orderworkjournal_id=OuterRef('pk')
+    ).order_by().values('orderworkjournal_id').annotate(
+        count=Count('*')
+    ).values('count')
+    return ExpressionWrapper(
+        F('duration') * Coalesce(Subquery(worker_count), 0),
+        output_field=DurationField()
+    )
+
+
+def refresh_journal_labor(journal_ids):
+    """Пересчитывает трудозатраты указанных записей журнала."""
+    journal_ids = _clean(journal_ids)
+    if journal_ids:
+        with transaction.atomic():
+            OrderWorkJournal.objects.filter(pk__in=journal_ids).update(
+                labor=_labor_expression(),
+                updated_at=timezone.now(),
+                change_seq=ChangeSequence.objects.allocate()
+            )
+
+
+def _worker_days(worker_ids=None, dates=None):
+    """Суммы закрытых записей по рабочим и дням."""
+    rows = JournalWorkers.objects.filter(orderworkjournal__duration__isnull=False)
+    if worker_ids is not None:
+        rows = rows.filter(worker_id__in=worker_ids)
+    if dates is not None:
+        rows = rows.filter(orderworkjournal__work_date__in=dates)
+    rows = rows.values('worker_id', 'orderworkjournal__work_date').annotate(
+        duration=Sum('orderworkjournal__duration'),
+        entries=Count('*')
+    ).order_by()
+    return (
+        WorkerLabor(
+            worker_id=row['worker_id'],
+            work_date=row['orderworkjournal__work_date'],
+            duration=row['duration'],
+            entries=row['entries']
+        )
+        for row in rows
+    )
+
+
+def refresh_worker_labor(worker_ids, dates):
+    """Пересчитывает дневные суммы указанных рабочих за указанные дни."""
+    worker_ids, dates = _clean(worker_ids), _clean(dates)
+    if not worker_ids or not dates:
+        return
+    with transaction.atomic():
+        WorkerLabor.objects.filter(worker_id__in=worker_ids, work_date__in=dates).delete()
+        WorkerLabor.objects.bulk_create(_worker_days(worker_ids, dates))
+
+
+def rebuild_journal_labor():
+    """Пересчитывает дату, длительность и трудозатраты всех записей журнала."""
+    OrderWorkJournal.objects.update(
+        work_date=TruncDate('start_time'),
+        duration=ExpressionWrapper(
+            F('end_time') - F('start_time'),
+            output_field=DurationField()
+        )
+    )
+    OrderWorkJournal.objects.update(labor=_labor_expression())
+
+
+def rebuild_worker_labor(batch_size=5000):
+    """Заново заполняет WorkerLabor и возвращает количество строк."""
+    with transaction.atomic():
+        WorkerLabor.objects.all().delete()
+        return len(WorkerLabor.objects.bulk_create(_worker_days(), batch_size=batch_size))
+
+
+def rebuild(batch_size=5000):
+    """Полностью пересчитывает трудозатраты записей и рабочих."""
+    with transaction.atomic():
+        rebuild_journal_labor()
+        return rebuild_worker_labor(batch_size)
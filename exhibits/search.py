@@ -0,0 +1,219 @@
+"""
+Полнотекстовый поиск заказов.
+
+В SQLite поиск идет по виртуальной таблице FTS5 exhibits_order_fts:
+rowid в ней - id заказа, столбцы - название, описание, имя заказчика,
+примечания и описания работ из журнала. Таблицу заполняют триггеры,
+созданные миграцией 0006_order_search, поэтому она обновляется при любой
+записи в заказы и журнал, включая bulk_create и update(). На других СУБД
+используется обычный поиск по вхождению подстроки.
+
+SQLite удаляет триггеры вместе с таблицей, а миграции Django пересоздают
+таблицу при многих изменениях схемы. Поэтому после каждого migrate
+ensure_triggers() восстанавливает недостающие триггеры и перестраивает
+индекс.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Order
+
+FTS_TABLE = 'exhibits_order_fts'
+FTS_COLUMNS = ('title', 'description', 'customer_name', 'notes', 'journal')
+# Веса столбцов для bm25: совпадение в названии важнее, чем в примечаниях.
+FTS_WEIGHTS = (10.0, 2.0, 5.0, 1.0, 1.0)
+FALLBACK_FIELDS = ('title', 'description', 'customer_name', 'notes')
+
+TOKEN = re.compile(r'\w+')
+# Границы совпадения во фрагменте; заменяются на <mark> после экранирования.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def fts_available(connection=connection):
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """
+    Выражение MATCH из пользовательского запроса: каждое слово ищется
+    как префикс, слова объединяются через AND. Синтаксис FTS5 во
+    вводе не интерпретируется. Пустая строка, если слов нет.
+    """
+    return ' AND '.join(f'"{token}"*' for token in TOKEN.findall(query))
+
+
+def filter_orders(queryset, query):
+    """Заказы queryset, найденные по запросу."""
+    if not fts_available():
+        condition = Q()
+        for token in TOKEN.findall(query):
+            condition &= Q(*(
+                Q(**{f'{field}__icontains': token}) for field in FALLBACK_FIELDS
+            ), _connector=Q.OR)
+        return queryset.filter(condition) if condition else queryset.none()
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)
+    ))
+
+
+def _highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def search_orders(query, limit=50):
+    """
+    Найденные заказы по убыванию релевантности и их общее количество.
+    Каждый заказ получает атрибут snippet - фрагмент текста с
+    выделенными совпадениями.
+    """
+    if not fts_available():
+        orders = filter_orders(Order.objects.select_related('furniture_type'), query)
+        results = list(orders[:limit])
+        for order in results:
+            order.snippet = ''
+        return results, orders.count()
+
+    match = build_match(query)
+    if not match:
+        return [], 0
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,)
+        )
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT rowid, snippet({FTS_TABLE}, -1, %s, %s, %s, 16) '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            (MARK_START, MARK_END, '…', match, limit)
+        )
+        rows = cursor.fetchall()
+    orders = Order.objects.select_related('furniture_type').in_bulk(
+        [pk for pk, _ in rows]
+    )
+    results = []
+    for pk, snippet in rows:
+        # Заказ мог быть удален между запросами.
+        if pk in orders:
+            order = orders[pk]
+            order.snippet = _highlight(snippet)
+            results.append(order)
+    return results, total
+
+
+def rebuild(connection=connection):
+    """Заново заполняет таблицу поиска из заказов и журнала."""
+    if not fts_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(REBUILD_SQL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+REBUILD_SQL = f'''
+INSERT INTO {FTS_TABLE} (rowid, title, description, customer_name, notes, journal)
+SELECT o.id, o.title, o.description, o.customer_name, o.notes,
+       coalesce((SELECT group_concat(j.work_description, ' ')
+                 FROM exhibits_orderworkjournal j WHERE j.order_id = o.id), '')
+FROM exhibits_order o
+'''
+
+
+# Те же триггеры, что создает миграция 0006_order_search.
+TRIGGERS = {
+    'exhibits_order_fts_insert': f'''
+        CREATE TRIGGER exhibits_order_fts_insert AFTER INSERT ON exhibits_order
+        BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, title, description, customer_name, notes, journal)
+            VALUES (new.id, new.title, new.description, new.customer_name, new.notes, '');
+        END
+    ''',
+    'exhibits_order_fts_update': f'''
+        CREATE TRIGGER exhibits_order_fts_update
+        AFTER UPDATE OF title, description, customer_name, notes ON exhibits_order
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+            OR old.customer_name IS NOT new.customer_name OR old.notes IS NOT new.notes
+        BEGIN
+            UPDATE {FTS_TABLE}
+            SET title = new.title, description = new.description,
+                customer_name = new.customer_name, notes = new.notes
+            WHERE rowid = new.id;
+        END
+    ''',
+    'exhibits_order_fts_delete': f'''
+        CREATE TRIGGER exhibits_order_fts_delete AFTER DELETE ON exhibits_order
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END
+    ''',
+    'exhibits_journal_fts_insert': f'''
+        CREATE TRIGGER exhibits_journal_fts_insert AFTER INSERT ON exhibits_orderworkjournal
+        WHEN new.work_description != ''
+        BEGIN
+            UPDATE {FTS_TABLE} SET journal = coalesce((
+                SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+                WHERE order_id = new.order_id
+            ), '') WHERE rowid = new.order_id;
+        END
+    ''',
+    'exhibits_journal_fts_update': f'''
+        CREATE TRIGGER exhibits_journal_fts_update
+        AFTER UPDATE OF work_description, order_id ON exhibits_orderworkjournal
+        WHEN old.work_description IS NOT new.work_description OR old.order_id IS NOT new.order_id
+        BEGIN
+            UPDATE {FTS_TABLE} SET journal = coalesce((
+                SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+                WHERE order_id = {FTS_TABLE}.rowid
+            ), '') WHERE rowid IN (old.order_id, new.order_id);
+        END
+    ''',
+    'exhibits_journal_fts_delete': f'''
+        CREATE TRIGGER exhibits_journal_fts_delete AFTER DELETE ON exhibits_orderworkjournal
+        WHEN old.work_description != ''
+        BEGIN
+            UPDATE {FTS_TABLE} SET journal = coalesce((
+                SELECT group_concat(work_description, ' ') FROM exhibits_orderworkjournal
+                WHERE order_id = old.order_id
+            ), '') WHERE rowid = old.order_id;
+        END
+    ''',
+}
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS):
+    """
+    Создает недостающие триггеры и, если их не было, перестраивает
+    таблицу поиска: пока триггеров не было, она могла отстать.
+    Возвращает имена созданных триггеров.
+    """
+    connection = connections[using]
+    if not fts_available(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if FTS_TABLE not in existing:
+            # Миграция 0006 еще не применена.
+            return []
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+    if missing:
+        rebuild(connection)
+    return missing
@@ -0,0 +1,439 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete, pre_save
+)
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import cache, reports, search, stats, thumbnails
+from .models import (
+    ChangeSequence, FurnitureType, Order, OrderPhoto, OrderWorkJournal, PhotoBlob,
+    Tombstone, Worker, Workshop, WorkshopStats, status_changed
+)
+
+User = get_user_model()
+
+
+def refresh_orders(order_ids):
+    """Пересчитывает денормализованные счетчики указанных заказов."""
+    order_ids = {pk for pk in order_ids if pk is not None}
+    if order_ids:
+        Order.objects.filter(pk__in=order_ids).refresh_counters()
+
+
+@receiver(m2m_changed, sender=Order.workshops.through)
+def order_workshops_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет workshop_count при изменении цехов заказа с любой стороны."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_orders([instance.pk])
+        return
+    # Со стороны цеха очистка не передает pk_set, поэтому
+    # затронутые заказы запоминаются до нее.
+    if action == 'pre_clear':
+        instance._cleared_order_ids = list(
+            instance.orders.values_list('pk', flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        refresh_orders(pk_set)
+    elif action == 'post_clear':
+        refresh_orders(instance.__dict__.pop('_cleared_order_ids', []))
+
+
+@receiver(pre_delete, sender=Workshop)
+def workshop_pre_delete(sender, instance, **kwargs):
+    """Каскадное удаление связей не шлет m2m_changed - запоминаем заказы."""
+    instance._order_ids = list(instance.orders.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Workshop)
+def workshop_post_delete(sender, instance, **kwargs):
+    refresh_orders(instance.__dict__.pop('_order_ids', []))
+
+
+@receiver(post_init, sender=OrderWorkJournal)
+def journal_post_init(sender, instance, **kwargs):
+    """Запись могут перенести в другой заказ или цех - старые тоже пересчитаем."""
+    # Отложенные поля не читаем, чтобы не делать лишний запрос.
+    instance._loaded_order_id = instance.__dict__.get('order_id')
+    instance._loaded_workshop_id = instance.__dict__.get('workshop_id')
+    instance._loaded_work_date = instance.__dict__.get('work_date')
+
+
+@receiver(post_save, sender=OrderWorkJournal)
+def journal_post_save(sender, instance, **kwargs):
+    refresh_orders([instance.order_id, instance._loaded_order_id])
+    instance._loaded_order_id = instance.order_id
+
+
+@receiver(post_delete, sender=OrderWorkJournal)
+def journal_post_delete(sender, instance, **kwargs):
+    refresh_orders([instance.order_id])
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderWorkJournal)
+@receiver(post_delete, sender=Worker)
+@receiver(post_delete, sender=Workshop)
+def tracked_deleted(sender, instance, **kwargs):
+    """Запоминает удаление, чтобы синхронизация сообщила о нем планшетам."""
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+        change_seq=ChangeSequence.objects.allocate()
+    )
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.WORKSHOPS, cache.FURNITURE_TYPES)
+
+
+@receiver(status_changed, sender=Order)
+def order_status_cache(sender, **kwargs):
+    cache.bump_version(cache.WORKSHOPS, cache.FURNITURE_TYPES)
+
+
+@receiver(m2m_changed, sender=Order.workshops.through)
+def order_workshops_cache(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.bump_version(cache.WORKSHOPS)
+
+
+@receiver([post_save, post_delete], sender=Workshop)
+@receiver([post_save, post_delete], sender=Worker)
+def workshop_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.WORKSHOPS)
+
+
+@receiver([post_save, post_delete], sender=OrderWorkJournal)
+def journal_changed(sender, instance, **kwargs):
+    """В списке цехов показаны открытые записи журнала и занятые рабочие."""
+    cache.bump_version(cache.WORKSHOPS)
+
+
+@receiver(m2m_changed, sender=OrderWorkJournal.workers.through)
+def journal_workers_cache(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.bump_version(cache.WORKSHOPS)
+
+
+@receiver(post_save, sender=User)
+def supervisor_changed(sender, instance, update_fields=None, **kwargs):
+    """В списке цехов показаны начальники; вход в систему их не меняет."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    cache.bump_version(cache.WORKSHOPS)
+
+
+@receiver([post_save, post_delete], sender=FurnitureType)
+def furniture_type_changed(sender, instance, **kwargs):
+    cache.bump_version(cache.FURNITURE_TYPES)
+
+
+@receiver(post_save, sender=Workshop)
+def workshop_stats_create(sender, instance, created, **kwargs):
+    if created:
+        WorkshopStats.objects.get_or_create(workshop=instance)
+
+
+@receiver(post_init, sender=Order)
+def order_post_init(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status')
+    instance._loaded_priority = instance.__dict__.get('priority')
+    instance._loaded_phone = instance.__dict__.get('customer_phone')
+
+
+def _order_workshop_ids(order):
+    return list(
+        Order.workshops.through.objects.filter(
+            order_id=order.pk
+        ).values_list('workshop_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Order)
+def order_stats_changed(sender, instance, created, **kwargs):
+    """Переносит заказ между счетчиками, если изменились статус или приоритет."""
+    old_status, old_priority = instance._loaded_status, instance._loaded_priority
+    instance._loaded_status, instance._loaded_priority = instance.status, instance.priority
+    if created or (old_status, old_priority) == (instance.status, instance.priority):
+        return
+    workshop_ids = _order_workshop_ids(instance)
+    if old_status is None or old_priority is None:
+        stats.refresh_active_orders(workshop_ids)
+        return
+    if old_status == stats.ACTIVE_STATUS:
+        stats.shift_active_orders(workshop_ids, old_priority, -1)
+    if instance.status == stats.ACTIVE_STATUS:
+        stats.shift_active_orders(workshop_ids, instance.priority, 1)
+
+
+@receiver(status_changed, sender=Order)
+def order_status_stats(sender, status, changes, **kwargs):
+    for old_status, change_seq in changes.items():
+        if old_status == stats.ACTIVE_STATUS:
+            stats.shift_changed_orders(change_seq, -1)
+        if status == stats.ACTIVE_STATUS:
+            stats.shift_changed_orders(change_seq, 1)
+
+
+@receiver(pre_delete, sender=Order)
+def order_stats_pre_delete(sender, instance, **kwargs):
+    if instance.status == stats.ACTIVE_STATUS:
+        instance._stats_workshop_ids = _order_workshop_ids(instance)
+
+
+@receiver(post_delete, sender=Order)
+def order_stats_post_delete(sender, instance, **kwargs):
+    workshop_ids = instance.__dict__.pop('_stats_workshop_ids', [])
+    stats.shift_active_orders(workshop_ids, instance.priority, -1)
+
+
+@receiver(m2m_changed, sender=Order.workshops.through)
+def order_workshops_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # Со стороны цеха затронут один цех - пересчитываем его целиком.
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            stats.refresh_active_orders([instance.pk])
+        return
+    if instance.status != stats.ACTIVE_STATUS:
+        return
+    if action == 'post_add':
+        stats.shift_active_orders(pk_set, instance.priority, 1)
+    elif action == 'pre_remove':
+        # remove() передает все указанные цеха, даже не связанные с заказом.
+        instance._stats_workshop_ids = list(
+            Order.workshops.through.objects.filter(
+                order_id=instance.pk, workshop_id__in=pk_set
+            ).values_list('workshop_id', flat=True)
+        )
+    elif action == 'post_remove':
+        workshop_ids = instance.__dict__.pop('_stats_workshop_ids', [])
+        stats.shift_active_orders(workshop_ids, instance.priority, -1)
+    elif action == 'pre_clear':
+        instance._stats_workshop_ids = _order_workshop_ids(instance)
+    elif action == 'post_clear':
+        workshop_ids = instance.__dict__.pop('_stats_workshop_ids', [])
+        stats.shift_active_orders(workshop_ids, instance.priority, -1)
+
+
+@receiver(post_save, sender=OrderWorkJournal)
+def journal_stats_saved(sender, instance, **kwargs):
+    stats.refresh_journal([instance.workshop_id, instance._loaded_workshop_id])
+    instance._loaded_workshop_id = instance.workshop_id
+
+
+@receiver(post_delete, sender=OrderWorkJournal)
+def journal_stats_deleted(sender, instance, **kwargs):
+    stats.refresh_journal([instance.workshop_id])
+
+
+def _journal_workshop_ids(journal_ids):
+    return list(
+        OrderWorkJournal.objects.filter(
+            pk__in=journal_ids
+        ).values_list('workshop_id', flat=True)
+    )
+
+
+@receiver(m2m_changed, sender=OrderWorkJournal.workers.through)
+def journal_workers_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            stats.refresh_journal([instance.workshop_id])
+    elif action in ('post_add', 'post_remove'):
+        stats.refresh_journal(_journal_workshop_ids(pk_set))
+    elif action == 'pre_clear':
+        instance._journal_workshop_ids = list(
+            instance.work_journal.values_list('workshop_id', flat=True)
+        )
+    elif action == 'post_clear':
+        stats.refresh_journal(instance.__dict__.pop('_journal_workshop_ids', []))
+
+
+@receiver(post_init, sender=Worker)
+def worker_post_init(sender, instance, **kwargs):
+    instance._loaded_workshop_id = instance.__dict__.get('workshop_id')
+
+
+@receiver(post_save, sender=Worker)
+def worker_stats_saved(sender, instance, **kwargs):
+    stats.refresh_workers([instance.workshop_id, instance._loaded_workshop_id])
+    instance._loaded_workshop_id = instance.workshop_id
+
+
+@receiver(pre_delete, sender=Worker)
+def worker_stats_pre_delete(sender, instance, **kwargs):
+    """Связи с журналом удаляются каскадом без m2m_changed."""
+    instance._journal_workshop_ids = list(
+        instance.work_journal.filter(
+            end_time__isnull=True
+        ).values_list('workshop_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Worker)
+def worker_stats_deleted(sender, instance, **kwargs):
+    stats.refresh_workers([instance.workshop_id])
+    stats.refresh_journal(instance.__dict__.pop('_journal_workshop_ids', []))
+
+
+def _journal_worker_ids(journal):
+    return list(
+        OrderWorkJournal.workers.through.objects.filter(
+            orderworkjournal_id=journal.pk
+        ).values_list('worker_id', flat=True)
+    )
+
+
+def _journal_dates(journal_ids):
+    return list(
+        OrderWorkJournal.objects.filter(
+            pk__in=journal_ids
+        ).values_list('work_date', flat=True)
+    )
+
+
+@receiver(post_save, sender=OrderWorkJournal)
+def journal_labor_saved(sender, instance, created, **kwargs):
+    """У новой записи еще нет рабочих - их трудозатраты учтет m2m_changed."""
+    old_date, instance._loaded_work_date = instance._loaded_work_date, instance.work_date
+    if created:
+        return
+    reports.refresh_journal_labor([instance.pk])
+    reports.refresh_worker_labor(
+        _journal_worker_ids(instance), [instance.work_date, old_date]
+    )
+
+
+@receiver(pre_delete, sender=OrderWorkJournal)
+def journal_labor_pre_delete(sender, instance, **kwargs):
+    """Связи с рабочими удаляются каскадом без m2m_changed."""
+    instance._labor_worker_ids = _journal_worker_ids(instance)
+
+
+@receiver(post_delete, sender=OrderWorkJournal)
+def journal_labor_deleted(sender, instance, **kwargs):
+    reports.refresh_worker_labor(
+        instance.__dict__.pop('_labor_worker_ids', []), [instance.work_date]
+    )
+
+
+@receiver(m2m_changed, sender=OrderWorkJournal.workers.through)
+def journal_workers_labor(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action == 'pre_clear':
+            instance._labor_worker_ids = _journal_worker_ids(instance)
+            return
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_labor_worker_ids', [])
+        elif action not in ('post_add', 'post_remove'):
+            return
+        reports.refresh_journal_labor([instance.pk])
+        reports.refresh_worker_labor(pk_set, [instance.work_date])
+        return
+    if action == 'pre_clear':
+        instance._labor_journal_ids = list(
+            instance.work_journal.values_list('pk', flat=True)
+        )
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_labor_journal_ids', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    reports.refresh_journal_labor(pk_set)
+    reports.refresh_worker_labor([instance.pk], _journal_dates(pk_set))
+
+
+@receiver(pre_delete, sender=Worker)
+def worker_labor_pre_delete(sender, instance, **kwargs):
+    """
+    Дневные суммы рабочего удалятся каскадом, а записи журнала - нет.
+    Связи с журналом тоже удаляются каскадом без m2m_changed.
+    """
+    instance._labor_journal_ids = list(
+        instance.work_journal.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Worker)
+def worker_labor_deleted(sender, instance, **kwargs):
+    # Открытые записи тоже: пересчет выдаст им новый номер изменения,
+    # ведь список их рабочих изменился.
+    reports.refresh_journal_labor(instance.__dict__.pop('_labor_journal_ids', []))
+
+
+@receiver(post_migrate)
+def order_search_triggers(sender, using, **kwargs):
+    """Восстанавливает триггеры поиска, удаленные при пересоздании таблиц."""
+    if sender.name == 'exhibits':
+        search.ensure_triggers(using)
+
+
+@receiver(post_init, sender=OrderPhoto)
+def photo_post_init(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+
+
+def _delete_photo_file(name):
+    storage = OrderPhoto._meta.get_field('image').storage
+    storage.delete(name)
+    thumbnails.delete(name, storage)
+
+
+def _release_photo_file(name):
+    """Убирает ссылку на файл и удаляет его после фиксации, если он не нужен."""
+    def delete_unused():
+        # Файл мог снова понадобиться новой загрузке: строка удаляется
+        # и файл стирается в одной транзакции, только если ссылок нет.
+        with transaction.atomic():
+            if PhotoBlob.objects.delete_unused(name):
+                _delete_photo_file(name)
+
+    if name and PhotoBlob.objects.release(name):
+        transaction.on_commit(delete_unused)
+
+
+@receiver(pre_save, sender=OrderPhoto)
+def photo_pre_save(sender, instance, **kwargs):
+    """Ссылку на новый загруженный файл возьмет хранилище при его сохранении."""
+    image = instance.image
+    instance._image_referenced = bool(image) and not image._committed
+
+
+@receiver(post_save, sender=OrderPhoto)
+def photo_saved(sender, instance, created, **kwargs):
+    """
+    Учитывает ссылки на файлы при новой или замененной фотографии и
+    ставит в очередь создание копий, если их еще нет у такого же файла.
+    """
+    name, old_name = instance.image.name, instance._loaded_image
+    referenced = instance.__dict__.pop('_image_referenced', False)
+    if created:
+        old_name = None
+    if name == old_name:
+        # Загружен тот же файл: вторая ссылка не нужна.
+        if referenced:
+            PhotoBlob.objects.release(name)
+        return
+    instance._loaded_image = name
+    _release_photo_file(old_name)
+    if not name:
+        return
+    if not referenced:
+        PhotoBlob.objects.acquire(name)
+    renditions = OrderPhoto.objects.filter(image=name).exclude(
+        renditions={}
+    ).values_list('renditions', flat=True).first() or {}
+    if renditions != instance.renditions:
+        instance.renditions = renditions
+        OrderPhoto.objects.filter(pk=instance.pk).update(renditions=renditions)
+    if not renditions:
+        transaction.on_commit(lambda: thumbnails.schedule(instance))
+
+
+@receiver(post_delete, sender=OrderPhoto)
+def photo_deleted(sender, instance, **kwargs):
+    _release_photo_file(instance._loaded_image)
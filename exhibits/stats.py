@@ -0,0 +1,164 @@
+"""
+Поддержка таблицы WorkshopStats.
+
+Количество заказов в работе меняется на ±1 выражениями F() без
+агрегирующих запросов. Остальные показатели (рабочие, незакрытые записи
+журнала, занятые рабочие) пересчитываются только для затронутых цехов:
+эти выборки малы и идут по индексам.
+"""
+from django.db.models import Case, Count, F, IntegerField, When
+from django.utils import timezone
+
+from .models import Order, OrderWorkJournal, Worker, Workshop, WorkshopStats
+
+ACTIVE_STATUS = 'in_progress'
+PRIORITY_FIELDS = {
+    priority: f'active_{priority}' for priority, _ in Order.PRIORITY_CHOICES
+}
+
+
+def _clean(workshop_ids):
+    return {pk for pk in workshop_ids if pk is not None}
+
+
+def shift_active_orders(workshop_ids, priority, delta):
+    """Изменяет счетчики заказов в работе на delta."""
+    workshop_ids = _clean(workshop_ids)
+    if not workshop_ids or not delta:
+        return
+    field = PRIORITY_FIELDS[priority]
+    WorkshopStats.objects.filter(workshop_id__in=workshop_ids).update(
+        active_orders=F('active_orders') + delta,
+        **{field: F(field) + delta},
+        updated_at=timezone.now()
+    )
+
+
+def shift_changed_orders(change_seq, delta):
+    """
+    Изменяет на delta счетчики цехов заказов, переведенных одним UPDATE
+    с номером изменения change_seq (см. OrderQuerySet.transition()).
+    """
+    rows = Order.workshops.through.objects.filter(
+        order__change_seq=change_seq
+    ).values('workshop_id', 'order__priority').annotate(count=Count('*'))
+    shifts = {}
+    for row in rows:
+        count = delta * row['count']
+        for field in ('active_orders', PRIORITY_FIELDS[row['order__priority']]):
+            shifts.setdefault(field, {}).setdefault(row['workshop_id'], 0)
+            shifts[field][row['workshop_id']] += count
+    if not shifts:
+        return
+    # Все цеха одним UPDATE: сдвиг каждого поля выбирается по цеху.
+    WorkshopStats.objects.filter(workshop_id__in=shifts['active_orders']).update(
+        **{
+            field: Case(
+                *(When(workshop_id=workshop_id, then=F(field) + shift)
+                  for workshop_id, shift in by_workshop.items()),
+                default=F(field),
+                output_field=IntegerField()
+            )
+            for field, by_workshop in shifts.items()
+        },
+        updated_at=timezone.now()
+    )
+
+
+def _active_orders(workshop_ids):
+    """Заказы в работе по цехам и приоритетам."""
+    rows = Order.workshops.through.objects.filter(
+        workshop_id__in=workshop_ids,
+        order__status=ACTIVE_STATUS
+    ).values('workshop_id', 'order__priority').annotate(count=Count('*'))
+    result = {}
+    for row in rows:
+        values = result.setdefault(row['workshop_id'], {})
+        values[PRIORITY_FIELDS[row['order__priority']]] = row['count']
+    return result
+
+
+def _journal(workshop_ids):
+    """Незакрытые записи журнала и занятые рабочие по цехам."""
+    entries = OrderWorkJournal.objects.filter(
+        workshop_id__in=workshop_ids,
+        end_time__isnull=True
+    ).values('workshop_id').annotate(count=Count('*'))
+    busy = OrderWorkJournal.workers.through.objects.filter(
+        orderworkjournal__workshop_id__in=workshop_ids,
+        orderworkjournal__end_time__isnull=True
+    ).values('orderworkjournal__workshop_id').annotate(
+        count=Count('worker_id', distinct=True)
+    )
+    result = {}
+    for row in entries:
+        result.setdefault(row['workshop_id'], {})['open_journal_entries'] = row['count']
+    for row in busy:
+        result.setdefault(row['orderworkjournal__workshop_id'], {})['busy_workers'] = row['count']
+    return result
+
+
+def _workers(workshop_ids):
+    rows = Worker.objects.filter(
+        workshop_id__in=workshop_ids
+    ).values('workshop_id').annotate(count=Count('*'))
+    return {row['workshop_id']: {'worker_count': row['count']} for row in rows}
+
+
+def _store(workshop_ids, fields, values):
+    """Записывает пересчитанные поля; отсутствие строки в values - ноль."""
+    now = timezone.now()
+    for workshop_id in workshop_ids:
+        data = values.get(workshop_id, {})
+        WorkshopStats.objects.filter(workshop_id=workshop_id).update(
+            **{field: data.get(field, 0) for field in fields},
+            updated_at=now
+        )
+
+
+def refresh_active_orders(workshop_ids):
+    workshop_ids = _clean(workshop_ids)
+    if workshop_ids:
+        fields = ['active_orders', *PRIORITY_FIELDS.values()]
+        values = _active_orders(workshop_ids)
+        for data in values.values():
+            data['active_orders'] = sum(data.values())
+        _store(workshop_ids, fields, values)
+
+
+def refresh_journal(workshop_ids):
+    workshop_ids = _clean(workshop_ids)
+    if workshop_ids:
+        _store(workshop_ids, ['open_journal_entries', 'busy_workers'], _journal(workshop_ids))
+
+
+def refresh_workers(workshop_ids):
+    workshop_ids = _clean(workshop_ids)
+    if workshop_ids:
+        _store(workshop_ids, ['worker_count'], _workers(workshop_ids))
+
+
+def rebuild():
+    """Полностью пересчитывает показатели всех цехов."""
+    workshop_ids = list(Workshop.objects.values_list('pk', flat=True))
+    values = {}
+    for part in (_workers(workshop_ids), _active_orders(workshop_ids), _journal(workshop_ids)):
+        for workshop_id, data in part.items():
+            values.setdefault(workshop_id, {}).update(data)
+
+    stats = []
+    for workshop_id in workshop_ids:
+        data = values.get(workshop_id, {})
+        data['active_orders'] = sum(data.get(field, 0) for field in PRIORITY_FIELDS.values())
+        stats.append(WorkshopStats(workshop_id=workshop_id, **data))
+    fields = [
+        field.name for field in WorkshopStats._meta.concrete_fields
+        if not field.primary_key
+    ]
+    WorkshopStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['workshop'],
+        update_fields=fields
+    )
+    return len(stats)
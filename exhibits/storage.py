@@ -0,0 +1,84 @@
+"""
+Хранилище фотографий заказов с адресацией по содержимому.
+
+Загрузка пишется во временный файл по частям, и одновременно считается
+ее SHA-256. Файл получает имя по хэшу в каталогах по первым символам:
+orders/photos/3f/a2/3fa2...e1.jpg. Одинаковые загрузки попадают в один
+файл, поэтому второй раз он не записывается, а подбор свободного имени
+при совпадении названий не нужен.
+
+Один файл могут использовать несколько фотографий; сколько именно,
+хранит PhotoBlob, и файл удаляется, только когда ссылок не осталось.
+Ссылку на сохраненный файл берет само хранилище, до проверки, есть ли
+файл: так параллельное удаление последней ссылки либо дождется загрузки
+и оставит файл, либо удалит его раньше, и загрузка запишет файл заново.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+INCOMING_DIR = '.incoming'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    hash_name = 'sha256'
+    # Уровни вложенности каталогов и длина имени каждого из них.
+    shard_levels = 2
+    shard_width = 2
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя зависит от содержимого и выбирается в _save().
+        return name
+
+    def hashed_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        shards = [
+            digest[level * self.shard_width:(level + 1) * self.shard_width]
+            for level in range(self.shard_levels)
+        ]
+        return '/'.join(filter(None, [directory, *shards, digest + extension]))
+
+    def _save(self, name, content):
+        incoming = self.path(INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.new(self.hash_name)
+        descriptor, temporary = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            name = self.hashed_name(name, digest.hexdigest())
+            path = self.path(name)
+            with transaction.atomic():
+                self.reference(name)
+                if os.path.exists(path):
+                    return name
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporary, self.file_permissions_mode)
+                # Переименование атомарно: одновременная загрузка того же
+                # файла просто заменит его таким же.
+                os.replace(temporary, path)
+            return name
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def reference(self, name):
+        """Добавляет ссылку на файл name в PhotoBlob."""
+        # Модели импортируют хранилище, поэтому импорт здесь.
+        from .models import PhotoBlob
+
+        PhotoBlob.objects.acquire(name)
+
+
+def photo_storage():
+    return ContentAddressedStorage()
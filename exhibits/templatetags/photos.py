@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html
+
+from exhibits.thumbnails import rendition_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def photo_img(photo, rendition='thumb', sizes=None, css_class=''):
+    """
+    Тег <img> фотографии заказа: src - копия rendition, srcset - все
+    готовые копии и оригинал, чтобы браузер сам выбрал размер по экрану.
+    Пока копии не созданы, показывается оригинал.
+    """
+    image = photo.image
+    widths = photo.renditions
+    if rendition not in widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            image.url, photo.description, css_class
+        )
+    urls = {
+        name: image.url if name == 'original' else image.storage.url(rendition_name(image.name, name))
+        for name in widths
+    }
+    srcset = ', '.join(
+        f'{urls[name]} {width}w'
+        for name, width in sorted(widths.items(), key=lambda item: item[1])
+    )
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy">',
+        urls[rendition], srcset, sizes or f'{widths[rendition]}px',
+        photo.description, css_class
+    )
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, Max
+from django.test import TestCase
+from django.utils import timezone
+
+from exhibits.models import Order, OrderWorkJournal
+
+from .utils import create_furniture_type, create_order, create_workshop
+
+
+class OrderCountersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.furniture_type = create_furniture_type()
+        cls.workshops = [create_workshop(number) for number in (1, 2, 3)]
+
+    def setUp(self):
+        self.order = create_order(self.furniture_type)
+
+    def assertCountersMatch(self):
+        expected = Order.objects.annotate(
+            real_count=Count('workshops', distinct=True),
+            real_last=Max('work_journal__start_time')
+        ).values_list('pk', 'real_count', 'real_last').order_by('pk')
+        stored = Order.objects.values_list(
+            'pk', 'workshop_count', 'last_journal_at'
+        ).order_by('pk')
+        self.assertEqual(list(stored), list(expected))
+
+    def add_journal(self, order=None, **fields):
+        return OrderWorkJournal.objects.create(
+            order=order or self.order, workshop=self.workshops[0], **fields
+        )
+
+    def test_workshops_changed_from_both_sides(self):
+        w1, w2, w3 = self.workshops
+        self.order.workshops.add(w1, w2)
+        self.assertCountersMatch()
+        w3.orders.add(self.order)
+        self.assertCountersMatch()
+        self.order.workshops.remove(w1)
+        self.assertCountersMatch()
+        w2.orders.clear()
+        self.assertCountersMatch()
+        self.order.workshops.set([w1, w3])
+        self.order.workshops.clear()
+        self.assertCountersMatch()
+
+    def test_workshop_deleted(self):
+        self.order.workshops.add(*self.workshops)
+        self.workshops[0].delete()
+        self.assertCountersMatch()
+
+    def test_journal_added_moved_and_deleted(self):
+        other = create_order(self.furniture_type)
+        first = self.add_journal(start_time=timezone.now() - timedelta(hours=2))
+        self.add_journal(start_time=timezone.now() - timedelta(hours=3))
+        self.assertCountersMatch()
+        first.order = other
+        first.save()
+        self.assertCountersMatch()
+        first.delete()
+        self.assertCountersMatch()
+
+    def test_full_save_keeps_counters(self):
+        self.order.workshops.add(*self.workshops[:2])
+        self.add_journal()
+        # В экземпляре счетчики прежние: их меняли только UPDATE.
+        self.assertEqual(self.order.workshop_count, 0)
+        self.order.priority = 'low'
+        self.order.save()
+        self.assertCountersMatch()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).priority, 'low')
+
+    def test_deferred_save_keeps_counters(self):
+        self.order.workshops.add(self.workshops[0])
+        order = Order.objects.only('title').get(pk=self.order.pk)
+        order.title = 'Новое название'
+        order.save()
+        self.assertNotIn('workshop_count', order.__dict__)
+        self.assertCountersMatch()
+
+    def test_repair_touches_only_stale_orders(self):
+        other = create_order(self.furniture_type)
+        self.order.workshops.add(*self.workshops)
+        self.add_journal()
+        Order.objects.filter(pk=self.order.pk).update(workshop_count=0, last_journal_at=None)
+        seq = Order.objects.get(pk=other.pk).change_seq
+        call_command('repair_order_counters', stdout=StringIO())
+        self.assertCountersMatch()
+        self.assertEqual(Order.objects.get(pk=other.pk).change_seq, seq)
+        self.assertEqual(
+            Order.objects.filter(pk__in=[self.order.pk, other.pk]).refresh_counters(), 0
+        )
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from exhibits.models import Order, OrderWorkJournal
+from exhibits.nplusone import assert_no_nplusone
+
+from .utils import create_furniture_type, create_order, create_worker, create_workshop
+
+User = get_user_model()
+
+# Больше порога NPLUSONE_THRESHOLD: запрос в цикле по ним будет замечен.
+ROWS = 8
+
+
+class NPlusOneTests(TestCase):
+    """Страницы со списками выполняют запросы на список, а не на строку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.workshop = create_workshop(1, supervisor=cls.user)
+        workers = [
+            create_worker(cls.workshop, last_name=f'Рабочий {number}')
+            for number in range(ROWS)
+        ]
+        for number in range(2, ROWS + 2):
+            create_workshop(number, supervisor=cls.user)
+        types = [create_furniture_type(title=f'Тип {number}') for number in range(ROWS)]
+        cls.orders = []
+        for number in range(ROWS + 4):
+            # Главная страница показывает заказы в работе.
+            order = create_order(
+                types[number % ROWS], title=f'Заказ {number}', status='in_progress'
+            )
+            order.workshops.add(cls.workshop)
+            cls.orders.append(order)
+        cls.order = cls.orders[0]
+        for number in range(ROWS):
+            entry = OrderWorkJournal.objects.create(
+                order=cls.order,
+                workshop=cls.workshop,
+                end_time=timezone.now(),
+                work_description=f'Работа {number}'
+            )
+            entry.workers.add(*workers[:number + 1])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertPageWithoutNPlusOne(self, url):
+        with assert_no_nplusone(label=url):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_order_list(self):
+        self.assertPageWithoutNPlusOne(reverse('exhibits:index'))
+
+    def test_order_detail(self):
+        self.assertPageWithoutNPlusOne(reverse('exhibits:order_detail', args=[self.order.pk]))
+
+    def test_workshop_list(self):
+        self.assertPageWithoutNPlusOne(reverse('exhibits:workshop_list'))
+
+    def test_workshop_detail(self):
+        self.assertPageWithoutNPlusOne(
+            reverse('exhibits:workshop_detail', args=[self.workshop.pk])
+        )
+
+    def test_profile(self):
+        self.assertPageWithoutNPlusOne(reverse('users:profile', args=[self.user.username]))
+
+    def test_loop_over_related_objects_is_reported(self):
+        with self.assertRaisesMessage(AssertionError, 'Возможный N+1'):
+            with assert_no_nplusone():
+                for order in Order.objects.all():
+                    order.furniture_type.title
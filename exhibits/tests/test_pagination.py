@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from exhibits.models import Order
+from exhibits.pagination import KeysetPaginator
+
+from .utils import create_furniture_type, create_order
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        furniture_type = create_furniture_type()
+        now = timezone.now()
+        for number in range(25):
+            order = create_order(furniture_type, title=f'Заказ {number}')
+            # Каждые три заказа с одним временем: порядок внутри - по id.
+            Order.objects.filter(pk=order.pk).update(
+                created_at=now - timedelta(minutes=number // 3)
+            )
+        cls.expected = list(
+            Order.objects.order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+
+    def paginator(self, per_page=4):
+        return KeysetPaginator(Order.objects.all(), per_page)
+
+    def pks(self, page):
+        return [order.pk for order in page]
+
+    def test_forward_pages_cover_list_once(self):
+        paginator = self.paginator()
+        seen, page = [], paginator.get_page()
+        self.assertFalse(page.has_previous())
+        while True:
+            seen += self.pks(page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(after=page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_pages_cover_list_once(self):
+        paginator = self.paginator()
+        page = paginator.get_page()
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+        seen = self.pks(page)
+        while page.has_previous():
+            page = paginator.get_page(before=page.previous_cursor)
+            seen = self.pks(page) + seen
+        self.assertEqual(seen, self.expected)
+
+    def test_invalid_cursor_gives_first_page(self):
+        page = self.paginator().get_page(after='не-курсор')
+        self.assertEqual(self.pks(page), self.expected[:4])
+
+    def test_seek_uses_one_index_range(self):
+        paginator = self.paginator()
+        values = paginator.decode_cursor(
+            paginator.encode_cursor(Order.objects.get(pk=self.expected[-2]))
+        )
+        for direction, queryset in (
+            ('after', paginator._after_queryset(values)),
+            ('before', paginator._before_queryset(values)),
+        ):
+            with self.subTest(direction=direction):
+                plan = queryset.explain()
+                # Один диапазон по индексу, а не OR из нескольких поисков
+                # или сканирование индекса с начала.
+                if connection.vendor == 'sqlite':
+                    self.assertEqual(plan.count('SEARCH exhibits_order'), 1, plan)
+                    self.assertNotIn('SCAN exhibits_order', plan)
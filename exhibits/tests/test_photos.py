@@ -0,0 +1,92 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from exhibits.models import OrderPhoto, PhotoBlob
+from exhibits.storage import ContentAddressedStorage
+
+from .utils import create_order
+
+
+class PhotoBlobTests(TestCase):
+    """Файлы фотографий хранятся один раз и удаляются без последней ссылки."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        # Уменьшенные копии создает пул процессов, здесь он не нужен.
+        self.enterContext(mock.patch('exhibits.thumbnails.schedule'))
+        self.order = create_order()
+        self.storage = OrderPhoto._meta.get_field('image').storage
+
+    def upload(self, content=b'photo', name='photo.jpg'):
+        return OrderPhoto.objects.create(
+            order=self.order, image=ContentFile(content, name=name)
+        )
+
+    def ref_count(self, name):
+        return PhotoBlob.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(name='a.jpg')
+        second = self.upload(name='b.jpg')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.ref_count(first.image.name), 2)
+
+    def test_file_deleted_with_last_reference(self):
+        first, second = self.upload(), self.upload()
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.ref_count(name), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.assertIsNone(self.ref_count(name))
+
+    def test_upload_during_pending_delete_keeps_file(self):
+        photo = self.upload()
+        name = photo.image.name
+        with self.captureOnCommitCallbacks() as callbacks:
+            photo.delete()
+        save = ContentAddressedStorage._save
+
+        def save_then_delete(storage, *args):
+            # Удаление выполняется после того, как хранилище нашло
+            # готовый файл, но до сохранения новой фотографии.
+            saved = save(storage, *args)
+            for callback in callbacks:
+                callback()
+            return saved
+
+        with mock.patch.object(ContentAddressedStorage, '_save', save_then_delete):
+            self.upload()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.ref_count(name), 1)
+
+    def test_upload_after_delete_writes_file_again(self):
+        photo = self.upload()
+        name = photo.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.delete()
+        self.assertFalse(self.storage.exists(name))
+        self.upload()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.ref_count(name), 1)
+
+    def test_replacing_image(self):
+        photo = self.upload(b'old')
+        old_name = photo.image.name
+        photo.image = ContentFile(b'old', name='again.jpg')
+        photo.save()
+        self.assertEqual(self.ref_count(old_name), 1)
+        photo.image = ContentFile(b'new', name='new.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            photo.save()
+        self.assertFalse(self.storage.exists(old_name))
+        self.assertEqual(self.ref_count(photo.image.name), 1)
@@ -0,0 +1,108 @@
+from django.forms.models import model_to_dict
+from django.test import TestCase
+from django.utils import timezone
+
+from exhibits import stats
+from exhibits.models import Order, OrderWorkJournal, WorkshopStats
+
+from .utils import create_furniture_type, create_order, create_worker, create_workshop
+
+
+class WorkshopStatsTests(TestCase):
+    """Показатели, обновленные по изменениям, совпадают с полным пересчетом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.furniture_type = create_furniture_type()
+        cls.workshops = [create_workshop(number) for number in (1, 2, 3)]
+
+    def assertStatsMatchRebuild(self):
+        def snapshot():
+            return [
+                model_to_dict(row, exclude=['updated_at'])
+                for row in WorkshopStats.objects.order_by('pk')
+            ]
+
+        incremental = snapshot()
+        stats.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def create_order(self, workshops, **fields):
+        order = create_order(self.furniture_type, **fields)
+        order.workshops.add(*workshops)
+        return order
+
+    def test_order_saved_and_deleted(self):
+        w1, w2, w3 = self.workshops
+        order = self.create_order([w1, w2], status='in_progress', priority='high')
+        self.assertStatsMatchRebuild()
+        order.priority = 'urgent'
+        order.save()
+        self.assertStatsMatchRebuild()
+        order.status = 'completed'
+        order.save()
+        self.assertStatsMatchRebuild()
+        order.status = 'in_progress'
+        order.save()
+        order.delete()
+        self.assertStatsMatchRebuild()
+
+    def test_order_workshops_changed(self):
+        w1, w2, w3 = self.workshops
+        self.create_order([w1], status='in_progress')
+        order = self.create_order([w1], status='in_progress')
+        order.workshops.add(w2, w3)
+        self.assertStatsMatchRebuild()
+        # Цех, не связанный с заказом, не уменьшает свои счетчики.
+        order.workshops.remove(w1)
+        order.workshops.remove(w1)
+        self.assertStatsMatchRebuild()
+        w3.orders.remove(order)
+        w1.orders.add(order)
+        self.assertStatsMatchRebuild()
+        order.workshops.clear()
+        self.assertStatsMatchRebuild()
+
+    def test_transition(self):
+        w1, w2, w3 = self.workshops
+        for priority in ('low', 'medium', 'medium', 'urgent'):
+            self.create_order([w1, w2], priority=priority)
+        self.create_order([w2, w3], status='in_progress', priority='high')
+        self.create_order([w3], status='completed')
+
+        self.assertEqual(Order.objects.all().transition('in_progress'), 4)
+        self.assertStatsMatchRebuild()
+        self.assertEqual(Order.objects.filter(priority='low').transition('cancelled'), 1)
+        self.assertStatsMatchRebuild()
+        self.assertEqual(Order.objects.all().transition('completed'), 4)
+        self.assertStatsMatchRebuild()
+        self.assertEqual(
+            WorkshopStats.objects.filter(active_orders__gt=0).count(), 0
+        )
+
+    def test_journal_and_workers(self):
+        w1, w2, w3 = self.workshops
+        order = self.create_order([w1])
+        worker, other = create_worker(w1), create_worker(w2)
+        self.assertStatsMatchRebuild()
+
+        entry = OrderWorkJournal.objects.create(order=order, workshop=w1)
+        entry.workers.add(worker, other)
+        self.assertStatsMatchRebuild()
+        entry.workshop = w2
+        entry.save()
+        self.assertStatsMatchRebuild()
+        other.work_journal.clear()
+        worker.workshop = w3
+        worker.save()
+        self.assertStatsMatchRebuild()
+        entry.end_time = timezone.now()
+        entry.save()
+        self.assertStatsMatchRebuild()
+
+        open_entry = OrderWorkJournal.objects.create(order=order, workshop=w3)
+        open_entry.workers.add(worker)
+        worker.delete()
+        self.assertStatsMatchRebuild()
+        open_entry.delete()
+        self.assertStatsMatchRebuild()
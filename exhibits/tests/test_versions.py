@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from exhibits.models import Customer, EditConflict, Order
+
+from .utils import create_order, create_workshop
+
+User = get_user_model()
+
+
+class EditConflictTests(TestCase):
+
+    def setUp(self):
+        self.order = create_order()
+
+    def stale_copy(self):
+        """Экземпляр, прочитанный до чужой правки."""
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.notes = 'Чужая правка'
+        self.order.save()
+        return stale
+
+    def test_plain_save_increments_version_in_database(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        self.order.save()
+        stale.save()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).version, 3)
+        self.assertEqual(stale.version, 2)
+
+    def test_matching_version_saves(self):
+        self.order.expected_version = self.order.version
+        self.order.title = 'Новое название'
+        self.order.save()
+        saved = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((saved.title, saved.version), ('Новое название', 2))
+        self.assertEqual(self.order.version, 2)
+        self.assertIsNone(self.order.expected_version)
+
+    def test_stale_version_raises_and_keeps_row(self):
+        stale = self.stale_copy()
+        stale.expected_version = stale.version
+        stale.title = 'Устаревшая правка'
+        with self.assertRaises(EditConflict):
+            stale.save()
+        saved = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((saved.title, saved.notes, saved.version), ('Заказ', 'Чужая правка', 2))
+        self.assertEqual(stale.version, 1)
+
+    def test_conflict_leaves_no_new_customer(self):
+        stale = self.stale_copy()
+        customers = Customer.objects.count()
+        stale.expected_version = stale.version
+        stale.customer_phone = '+7 911 111-11-11'
+        with transaction.atomic():
+            with self.assertRaises(EditConflict):
+                stale.save()
+            # Точка сохранения оставляет внешнюю транзакцию рабочей.
+            self.assertEqual(Customer.objects.count(), customers)
+
+    def test_deferred_version_stays_deferred(self):
+        order = Order.objects.defer('version').get(pk=self.order.pk)
+        order.save()
+        self.assertIn('version', order.get_deferred_fields())
+        self.assertEqual(order.version, 2)
+
+    def test_status_transition_conflicts_with_open_form(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        Order.objects.filter(pk=self.order.pk).transition('in_progress')
+        stale.expected_version = stale.version
+        with self.assertRaises(EditConflict):
+            stale.save()
+
+
+class OrderEditConflictViewTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        )
+        self.order = create_order()
+        self.order.workshops.add(create_workshop(1))
+
+    def post_edit(self, version, **fields):
+        data = {
+            'title': self.order.title,
+            'customer_name': self.order.customer_name,
+            'customer_phone': self.order.customer_phone,
+            'furniture_type': self.order.furniture_type_id,
+            'workshops': [workshop.pk for workshop in self.order.workshops.all()],
+            'status': self.order.status,
+            'priority': self.order.priority,
+            'deadline': self.order.deadline.isoformat(),
+            'version': version,
+            **fields
+        }
+        return self.client.post(reverse('exhibits:order_edit', args=[self.order.pk]), data)
+
+    def test_stale_form_shows_conflict(self):
+        self.order.save()
+        response = self.post_edit(1, title='Моя правка')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Запись изменили')
+        self.assertEqual(Order.objects.get(pk=self.order.pk).title, 'Заказ')
+
+    def test_current_form_saves(self):
+        response = self.post_edit(1, title='Моя правка')
+        self.assertRedirects(
+            response, reverse('exhibits:order_detail', args=[self.order.pk]),
+            fetch_redirect_response=False
+        )
+        self.assertEqual(Order.objects.get(pk=self.order.pk).title, 'Моя правка')
@@ -0,0 +1,38 @@
+"""Создание данных для тестов без лишних обязательных полей в каждом тесте."""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from exhibits.models import FurnitureType, Order, Worker, Workshop
+
+
+def create_furniture_type(**fields):
+    return FurnitureType.objects.create(**{'title': 'Шкаф', **fields})
+
+
+def create_workshop(number, **fields):
+    return Workshop.objects.create(
+        **{'title': f'Цех {number}', 'workshop_number': number, **fields}
+    )
+
+
+def create_worker(workshop, **fields):
+    return Worker.objects.create(
+        **{
+            'first_name': 'Иван', 'last_name': 'Иванов', 'position': 'Столяр',
+            'workshop': workshop, **fields
+        }
+    )
+
+
+def create_order(furniture_type=None, **fields):
+    return Order.objects.create(
+        **{
+            'title': 'Заказ',
+            'customer_name': 'Петров',
+            'customer_phone': '+7 900 000-00-00',
+            'furniture_type': furniture_type or create_furniture_type(),
+            'deadline': timezone.localdate() + timedelta(days=10),
+            **fields
+        }
+    )
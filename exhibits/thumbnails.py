@@ -0,0 +1,148 @@
+"""
+Уменьшенные копии фотографий заказов.
+
+Для каждой фотографии рядом с оригиналом создаются JPEG-копии из
+RENDITIONS: orders/photos/a.png -> orders/photos/a.thumb.jpg и
+a.medium.jpg. Сжатие снимка с камеры занимает сотни миллисекунд, поэтому
+оно идет в пуле процессов: после загрузки фотография ставится в очередь,
+а страницы показывают оригинал, пока OrderPhoto.renditions пуст.
+
+Модуль импортируется и в дочерних процессах пула, где Django не
+настроен, поэтому модели импортируются внутри функций.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import connection
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Наибольшая сторона копии в пикселях, от большей к меньшей.
+RENDITIONS = {
+    'medium': 1280,
+    'thumb': 400,
+}
+JPEG_QUALITY = 82
+ORIENTATION = 0x0112
+
+_executor = None
+# Файлы в очереди пула: одинаковые загрузки обрабатываются один раз.
+_pending = set()
+# Пул и очередь меняют потоки запросов и потоки обратных вызовов пула.
+_lock = threading.Lock()
+
+
+def rendition_name(name, rendition):
+    """Имя файла копии в хранилище оригинала."""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{rendition}.jpg'
+
+
+def render(source, targets):
+    """
+    Создает копии файла source. targets - {копия: (путь, сторона)}
+    от большей копии к меньшей; каждая следующая уменьшается из
+    предыдущей. Возвращает ширину копий и оригинала.
+    Выполняется в дочернем процессе.
+    """
+    with Image.open(source) as image:
+        # Браузер поворачивает снимок по EXIF, и в srcset нужна ширина
+        # уже повернутого оригинала.
+        rotated = image.getexif().get(ORIENTATION) in (5, 6, 7, 8)
+        widths = {'original': image.height if rotated else image.width}
+        if image.format == 'JPEG':
+            # Декодер JPEG сразу уменьшает снимок в 2-8 раз, если копии
+            # не нужно больше: это быстрее и экономит память.
+            largest = max(size for _, size in targets.values())
+            image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        for rendition, (path, size) in targets.items():
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            # Копия пишется во временный файл и подменяется целиком,
+            # чтобы страница не получила недописанный файл.
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(descriptor, 'wb') as file:
+                image.save(file, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(temporary, path)
+            widths[rendition] = image.width
+    return widths
+
+
+def targets(name, storage):
+    """Аргумент targets функции render для файла name."""
+    return {
+        rendition: (storage.path(rendition_name(name, rendition)), size)
+        for rendition, size in RENDITIONS.items()
+    }
+
+
+def create_executor(workers=None):
+    """
+    Пул процессов для обработки фотографий. Процессы запускаются через
+    spawn: копия процесса веб-сервера с его потоками и соединениями
+    с базой через fork небезопасна.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers or getattr(settings, 'THUMBNAIL_WORKERS', 2),
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def get_executor():
+    """Общий пул процесса веб-сервера; создается при первой загрузке."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = create_executor()
+        return _executor
+
+
+def _finished(name, future):
+    """Сохраняет размеры готовых копий; вызывается в потоке пула."""
+    from .models import OrderPhoto
+
+    with _lock:
+        _pending.discard(name)
+    try:
+        widths = future.result()
+    except Exception:
+        logger.exception('Не удалось создать копии фотографии %s', name)
+        return
+    try:
+        # Копии общие для всех фотографий с этим файлом. Фотографию,
+        # заменённую во время обработки, условие не затронет.
+        OrderPhoto.objects.filter(image=name).update(renditions=widths)
+    finally:
+        connection.close()
+
+
+def delete(name, storage):
+    """Удаляет копии файла name."""
+    for rendition in RENDITIONS:
+        storage.delete(rendition_name(name, rendition))
+
+
+def schedule(photo):
+    """Ставит создание копий фотографии в очередь пула."""
+    name, storage = photo.image.name, photo.image.storage
+    with _lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+    try:
+        future = get_executor().submit(render, storage.path(name), targets(name, storage))
+    except Exception:
+        with _lock:
+            _pending.discard(name)
+        raise
+    future.add_done_callback(partial(_finished, name))
+    return future
@@ -0,0 +1,71 @@
+"""
+Повтор транзакций записи при блокировке SQLite.
+
+SQLite допускает одного пишущего. Если busy_timeout истек, а блокировка
+так и не освободилась, запрос получает "database is locked". Транзакция
+при этом откатывается целиком, поэтому ее можно безопасно выполнить
+заново после паузы.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def is_lock_error(error):
+    return 'database is locked' in str(error) or 'database table is locked' in str(error)
+
+
+def atomic_retry(func=None, *, using=DEFAULT_DB_ALIAS):
+    """
+    Выполняет функцию в транзакции и повторяет ее при блокировке базы
+    с растущей паузой (DATABASE_LOCK_RETRIES, DATABASE_LOCK_BACKOFF).
+    Внутри уже открытой транзакции повтор невозможен: ошибка передается
+    наружу, и повторяет ее внешний atomic_retry.
+    """
+    if func is None:
+        return functools.partial(atomic_retry, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if transaction.get_connection(using).in_atomic_block:
+            return func(*args, **kwargs)
+        retries = getattr(settings, 'DATABASE_LOCK_RETRIES', 3)
+        delay = getattr(settings, 'DATABASE_LOCK_BACKOFF', 0.1)
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic(using=using):
+                    return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == retries or not is_lock_error(error):
+                    raise
+                # Случайная добавка разводит повторы одновременно
+                # заблокированных запросов.
+                pause = delay * 2 ** attempt * random.uniform(1, 1.5)
+                logger.warning(
+                    'База заблокирована, повтор %s через %.2f с: %s',
+                    func.__qualname__, pause, error
+                )
+                time.sleep(pause)
+    return wrapper
+
+
+def atomic_view(view):
+    """
+    atomic_retry для представлений: транзакцию открывают только запросы,
+    изменяющие данные. GET с формой не занимает блокировку записи на все
+    время отрисовки страницы.
+    """
+    retrying = atomic_retry(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return view(request, *args, **kwargs)
+        return retrying(request, *args, **kwargs)
+    return wrapper
@@ -1,21 +1,43 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Представления только для чтения: асинхронные под ASGI, иначе синхронные.
+read_views = async_views if settings.EXHIBITS_ASYNC_VIEWS else views
 
 app_name = 'exhibits'
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('', read_views.index, name='index'),
+    path('orders/search/', views.order_search, name='order_search'),
+    path('orders/<int:order_id>/', read_views.order_detail, name='order_detail'),
     path('orders/create/', views.order_create, name='order_create'),
+    path('orders/import/', views.order_import, name='order_import'),
     path('orders/<int:order_id>/edit/', views.order_edit, name='order_edit'),
     path('orders/<int:order_id>/delete/', views.order_delete, name='order_delete'),
     path('orders/<int:order_id>/complete/', views.complete_order, name='complete_order'),
+    path('orders/status/', views.order_bulk_status, name='order_bulk_status'),
     path('orders/<int:order_id>/work_journal/', views.add_work_journal, name='add_work_journal'),
     path('orders/<int:order_id>/edit_journal/<int:journal_id>/', views.edit_work_journal, name='edit_work_journal'),
     path('orders/<int:order_id>/delete_journal/<int:journal_id>/', views.delete_work_journal, name='delete_work_journal'),
-    path('furniture-types/', views.furniture_type_list, name='furniture_type_list'),
-    path('furniture-types/<int:furniture_type_id>/', views.furniture_type_detail, name='furniture_type_detail'),
-    path('workshops/', views.workshop_list, name='workshop_list'),
-    path('workshops/<int:workshop_id>/', views.workshop_detail, name='workshop_detail'),
+    path('customers/', views.customer_search, name='customer_search'),
+    path('customers/<int:customer_id>/', views.customer_detail, name='customer_detail'),
+    path('furniture-types/', read_views.furniture_type_list, name='furniture_type_list'),
+    path('furniture-types/<int:furniture_type_id>/', read_views.furniture_type_detail, name='furniture_type_detail'),
+    path('workshops/', read_views.workshop_list, name='workshop_list'),
+    path('workshops/<int:workshop_id>/', read_views.workshop_detail, name='workshop_detail'),
+    path('workers/choices/', views.worker_choices, name='worker_choices'),
+    path('reports/labor/', views.labor_report, name='labor_report'),
+    path('export/orders.csv', views.export_orders, name='export_orders'),
+    path('export/work-journal.csv', views.export_journal, name='export_journal'),
+    path('api/orders/', api.order_list, name='api_order_list'),
+    path('api/orders/<int:order_id>/', api.order_detail, name='api_order_detail'),
+    path('api/workshops/', api.workshop_list, name='api_workshop_list'),
+    path('api/workshops/<int:workshop_id>/', api.workshop_detail, name='api_workshop_detail'),
+    path('api/workers/', api.worker_list, name='api_worker_list'),
+    path('api/workers/<int:worker_id>/', api.worker_detail, name='api_worker_detail'),
+    path('api/journal/', api.journal_list, name='api_journal_list'),
+    path('api/journal/<int:journal_id>/', api.journal_detail, name='api_journal_detail'),
+    path('api/sync/', api.sync, name='api_sync'),
 ]
 
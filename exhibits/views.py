@@ -1,44 +1,107 @@
+from datetime import datetime, time, timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
 from django.contrib.auth import get_user_model
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.db.models import Count, Q
 from django.utils import timezone
-from .models import Order, FurnitureType, Workshop, Worker, OrderWorkJournal
-from .forms import OrderForm, OrderWorkJournalForm
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import (
+    Customer, EditConflict, Order, FurnitureType, Workshop, Worker, OrderWorkJournal, normalize_phone
+)
+from .forms import (
+    ExportForm, LaborReportForm, OrderForm, OrderImportUploadForm, OrderStatusForm,
+    OrderWorkJournalForm
+)
+from . import cache, export, reports, search
+from .importer import COLUMNS as IMPORT_COLUMNS, OrderImporter
+from .pagination import KeysetPaginator
+from .transactions import atomic_retry, atomic_view
 
 User = get_user_model()
 
+# Заказов в отчете по трудозатратам - самые трудоемкие.
+LABOR_REPORT_LIMIT = 100
+# Результатов поиска на странице - самые релевантные.
+SEARCH_LIMIT = 50
+# Рабочих в одном ответе подбора для записи журнала.
+WORKER_CHOICES_LIMIT = 20
+
 
 def get_active_orders():
     """Получить активные заказы."""
     return Order.active.select_related('furniture_type')
 
 
+def get_order_page(request, order_list, count=True):
+    """Страница заказов по курсору из параметров after/before."""
+    paginator = KeysetPaginator(order_list, 10, count=count)
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+
+
 def index(request):
     """Главная страница со списком заказов."""
-    order_list = get_active_orders().annotate(
-        workshop_count=Count('workshops')
-    )
-    paginator = Paginator(order_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    order_list = get_active_orders()
+    page_obj = get_order_page(request, order_list, count=False)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'exhibits/index.html', context)
 
 
-def order_detail(request, order_id):
-    """Страница детального просмотра заказа."""
-    order = get_object_or_404(
-        Order.objects.select_related('furniture_type').prefetch_related('workshops', 'photos'),
-        pk=order_id
-    )
-    
-    work_journal = order.work_journal.select_related('workshop').prefetch_related('workers').all()
+def order_search(request):
+    """Поиск заказов по тексту с фрагментами найденного."""
+    query = request.GET.get('q', '').strip()
+    orders, total = search.search_orders(query, limit=SEARCH_LIMIT) if query else ([], 0)
+    context = {
+        'query': query,
+        'orders': orders,
+        'total': total,
+        'limit': SEARCH_LIMIT,
+    }
+    return render(request, 'exhibits/search.html', context)
+
+
+@login_required
+def customer_search(request):
+    """Поиск заказчика по телефону в любом формате."""
+    phone = request.GET.get('phone', '').strip()
+    key = normalize_phone(phone)
+    if key:
+        customer = Customer.objects.filter(phone_key=key).first()
+        if customer:
+            return redirect('exhibits:customer_detail', customer_id=customer.pk)
+    context = {
+        'phone': phone,
+    }
+    return render(request, 'exhibits/customer_search.html', context)
+
+
+@login_required
+def customer_detail(request, customer_id):
+    """Заказчик и история его заказов."""
+    customer = get_object_or_404(Customer, pk=customer_id)
+    # Индекс (customer, -created_at, -id) отдает страницу без сортировки.
+    order_list = Order.objects.filter(customer=customer).select_related('furniture_type')
+    page_obj = get_order_page(request, order_list, count=False)
+    context = {
+        'customer': customer,
+        'page_obj': page_obj,
+    }
+    return render(request, 'exhibits/customer_detail.html', context)
+
+
+def get_work_journal(order):
+    return order.work_journal.select_related('workshop').prefetch_related('workers').all()
+
+
+def get_journal_form_context(request, order):
+    """Форма журнала и записи для правки или удаления из параметров запроса."""
     form = None
     edit_journal_id = request.GET.get('edit_journal')
     delete_journal_id = request.GET.get('delete_journal')
@@ -55,20 +118,36 @@ def order_detail(request, order_id):
         if delete_journal_id:
             journal_to_delete = get_object_or_404(OrderWorkJournal, pk=delete_journal_id, order=order)
     
-    context = {
-        'order': order,
-        'work_journal': work_journal,
+    return {
         'form': form,
         'journal_to_edit': journal_to_edit,
         'journal_to_delete': journal_to_delete,
     }
+
+
+def order_detail(request, order_id):
+    """Страница детального просмотра заказа."""
+    order = get_object_or_404(
+        Order.objects.select_related('furniture_type').prefetch_related('workshops', 'photos'),
+        pk=order_id
+    )
+    
+    context = {
+        'order': order,
+        'work_journal': get_work_journal(order),
+        **get_journal_form_context(request, order),
+    }
     return render(request, 'exhibits/order_detail.html', context)
 
 
 def furniture_type_list(request):
     """Список типов мебели."""
-    furniture_types = FurnitureType.objects.annotate(
-        order_count=Count('orders')
+    furniture_types = cache.cached(
+        cache.FURNITURE_TYPES,
+        'list',
+        lambda: list(FurnitureType.objects.annotate(
+            order_count=Count('orders')
+        ))
     )
     context = {
         'furniture_types': furniture_types,
@@ -81,12 +160,8 @@ def furniture_type_detail(request, furniture_type_id):
     furniture_type = get_object_or_404(FurnitureType, pk=furniture_type_id)
     order_list = get_active_orders().filter(
         furniture_type=furniture_type
-    ).annotate(
-        workshop_count=Count('workshops')
     )
-    paginator = Paginator(order_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_order_page(request, order_list, count=False)
     context = {
         'furniture_type': furniture_type,
         'page_obj': page_obj,
@@ -96,9 +171,10 @@ def furniture_type_detail(request, furniture_type_id):
 
 def workshop_list(request):
     """Список цехов."""
-    workshops = Workshop.objects.select_related('supervisor').annotate(
-        worker_count=Count('workers'),
-        active_order_count=Count('orders', filter=Q(orders__status='in_progress'))
+    workshops = cache.cached(
+        cache.WORKSHOPS,
+        'list',
+        lambda: list(Workshop.objects.select_related('supervisor', 'stats'))
     )
     context = {
         'workshops': workshops,
@@ -109,7 +185,7 @@ def workshop_list(request):
 def workshop_detail(request, workshop_id):
     """Детальная страница цеха."""
     workshop = get_object_or_404(
-        Workshop.objects.select_related('supervisor').prefetch_related('workers'),
+        Workshop.objects.select_related('supervisor', 'stats'),
         pk=workshop_id
     )
     workers = workshop.workers.all()
@@ -123,6 +199,7 @@ def workshop_detail(request, workshop_id):
 
 
 @login_required
+@atomic_view
 def order_create(request):
     """Создание нового заказа."""
     form = OrderForm(request.POST or None, request.FILES or None)
@@ -135,19 +212,26 @@ def order_create(request):
 
 
 @login_required
+@atomic_view
 def order_edit(request, order_id):
     """Редактирование заказа."""
     order = get_object_or_404(Order, pk=order_id)
     
     form = OrderForm(request.POST or None, request.FILES or None, instance=order)
     if form.is_valid():
-        form.save()
-        return redirect('exhibits:order_detail', order_id=order.id)
+        try:
+            form.save()
+        except EditConflict:
+            if not form.add_conflict_error():
+                raise Http404('Заказ удален.')
+        else:
+            return redirect('exhibits:order_detail', order_id=order.id)
     return render(request, 'exhibits/order_form.html', {'form': form, 'order': order})
 
 
 @login_required
 @require_http_methods(['GET', 'POST'])
+@atomic_view
 def order_delete(request, order_id):
     """Удаление заказа."""
     order = get_object_or_404(Order, pk=order_id)
@@ -162,6 +246,7 @@ def order_delete(request, order_id):
 
 @login_required
 @require_http_methods(['POST'])
+@atomic_view
 def add_work_journal(request, order_id):
     """Добавление записи в журнал работы."""
     order = get_object_or_404(Order, pk=order_id)
@@ -176,6 +261,7 @@ def add_work_journal(request, order_id):
 
 @login_required
 @require_http_methods(['GET', 'POST'])
+@atomic_view
 def edit_work_journal(request, order_id, journal_id):
     """Редактирование записи журнала работы."""
     order = get_object_or_404(Order, pk=order_id)
@@ -183,7 +269,19 @@ def edit_work_journal(request, order_id, journal_id):
     
     form = OrderWorkJournalForm(request.POST or None, instance=journal)
     if form.is_valid():
-        form.save()
+        try:
+            form.save()
+        except EditConflict:
+            if not form.add_conflict_error():
+                raise Http404('Запись журнала удалена.')
+            context = {
+                'order': order,
+                'work_journal': get_work_journal(order),
+                'form': form,
+                'journal_to_edit': journal,
+                'journal_to_delete': None,
+            }
+            return render(request, 'exhibits/order_detail.html', context)
         return redirect('exhibits:order_detail', order_id=order_id)
     
     from django.http import HttpResponseRedirect
@@ -192,6 +290,7 @@ def edit_work_journal(request, order_id, journal_id):
 
 @login_required
 @require_http_methods(['GET', 'POST'])
+@atomic_view
 def delete_work_journal(request, order_id, journal_id):
     """Удаление записи журнала работы."""
     order = get_object_or_404(Order, pk=order_id)
@@ -206,9 +305,156 @@ def delete_work_journal(request, order_id, journal_id):
 
 
 @login_required
+@require_POST
+@atomic_retry
 def complete_order(request, order_id):
-    """Завершение заказа."""
-    order = get_object_or_404(Order, pk=order_id)
-    order.mark_completed()
+    """Завершение заказа; уже выполненный или отмененный не меняется."""
+    if not Order.objects.filter(pk=order_id).transition('completed'):
+        get_object_or_404(Order.objects.only('pk'), pk=order_id)
     return redirect('exhibits:order_detail', order_id=order_id)
 
+
+@login_required
+@require_POST
+@atomic_retry
+def order_bulk_status(request):
+    """
+    Завершение или отмена выбранных заказов. Начальник цеха меняет
+    только заказы своих цехов, суперпользователь - любые.
+    """
+    form = OrderStatusForm(request.POST)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    orders = Order.objects.filter(pk__in=form.cleaned_data['orders'])
+    if not request.user.is_superuser:
+        orders = orders.filter(workshops__supervisor=request.user)
+    orders.transition(form.cleaned_data['status'])
+    next_url = request.POST.get('next')
+    if not url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        next_url = 'exhibits:index'
+    return redirect(next_url)
+
+
+@login_required
+@require_safe
+def worker_choices(request):
+    """
+    Рабочие цеха для формы журнала: ?workshop=3&q=Ив ищет по началу
+    фамилии или имени. Возвращает не больше WORKER_CHOICES_LIMIT рабочих
+    и признак more, если подходящих больше.
+    """
+    try:
+        workshop_id = int(request.GET.get('workshop', ''))
+    except ValueError:
+        return HttpResponseBadRequest('Не указан цех.')
+    workers = Worker.objects.filter(workshop_id=workshop_id)
+    query = request.GET.get('q', '').strip()
+    if query:
+        # Имена хранятся с заглавной буквы, а LIKE в SQLite не сравнивает
+        # кириллицу без учета регистра.
+        prefix = query[:1].upper() + query[1:]
+        workers = workers.filter(
+            Q(last_name__startswith=prefix) | Q(first_name__startswith=prefix)
+        )
+    workers = list(
+        workers.order_by('last_name', 'first_name', 'id').only(
+            'last_name', 'first_name', 'patronymic'
+        )[:WORKER_CHOICES_LIMIT + 1]
+    )
+    return JsonResponse({
+        'results': [
+            {'id': worker.pk, 'name': worker.get_full_name()}
+            for worker in workers[:WORKER_CHOICES_LIMIT]
+        ],
+        'more': len(workers) > WORKER_CHOICES_LIMIT,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@login_required
+def labor_report(request):
+    """Отчет по трудозатратам за период."""
+    today = timezone.now().date()
+    data = request.GET or {
+        'group': 'worker',
+        'date_from': today.replace(day=1),
+        'date_to': today,
+    }
+    form = LaborReportForm(data)
+    rows = []
+    group = None
+    if form.is_valid():
+        group = form.cleaned_data['group']
+        rows = reports.labor_hours(
+            group,
+            form.cleaned_data['date_from'],
+            form.cleaned_data['date_to'],
+            limit=LABOR_REPORT_LIMIT if group == 'order' else None
+        )
+    context = {
+        'form': form,
+        'rows': rows,
+        'group': group,
+        'total_hours': round(sum(row['hours'] for row in rows), 2),
+        'limit': LABOR_REPORT_LIMIT,
+        'export_form': ExportForm(),
+    }
+    return render(request, 'exhibits/labor_report.html', context)
+
+
+@login_required
+def order_import(request):
+    """Импорт заказов из CSV-файла."""
+    form = OrderImportUploadForm(request.POST or None, request.FILES or None)
+    result = None
+    if form.is_valid():
+        result = OrderImporter(dry_run=form.cleaned_data['dry_run']).run(
+            form.cleaned_data['file']
+        )
+    context = {
+        'form': form,
+        'result': result,
+        'dry_run': form.is_bound and form.cleaned_data.get('dry_run'),
+        'columns': [names[1] for names in IMPORT_COLUMNS.values()],
+    }
+    return render(request, 'exhibits/order_import.html', context)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+@login_required
+def export_orders(request):
+    """Выгрузка заказов в CSV; период - по дате создания."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    orders = Order.objects.all()
+    date_from, date_to = form.cleaned_data['date_from'], form.cleaned_data['date_to']
+    if date_from:
+        orders = orders.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        orders = orders.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+    return export.csv_response(
+        'orders.csv', export.ORDER_HEADER, export.order_rows(orders),
+        compress=form.cleaned_data['gzip']
+    )
+
+
+@login_required
+def export_journal(request):
+    """Выгрузка журнала работ в CSV; период - по дате работы."""
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    entries = OrderWorkJournal.objects.all()
+    if form.cleaned_data['date_from']:
+        entries = entries.filter(work_date__gte=form.cleaned_data['date_from'])
+    if form.cleaned_data['date_to']:
+        entries = entries.filter(work_date__lte=form.cleaned_data['date_to'])
+    return export.csv_response(
+        'work_journal.csv', export.JOURNAL_HEADER, export.journal_rows(entries),
+        compress=form.cleaned_data['gzip']
+    )
@@ -43,8 +43,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'exhibits.nplusone.NPlusOneMiddleware',
+    'exhibits.replicas.ReplicaMiddleware',
 ]
 
+# Поиск N+1 запросов (по умолчанию только при DEBUG).
+# В тестах включите NPLUSONE_RAISE, чтобы повторяющиеся запросы
+# приводили к ошибке, а не к записи в журнал.
+NPLUSONE_ENABLED = DEBUG
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_RAISE = False
+
 ROOT_URLCONF = 'factory.urls'
 
 TEMPLATES = [
@@ -64,6 +73,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'factory.wsgi.application'
+ASGI_APPLICATION = 'factory.asgi.application'
+
+# Асинхронные представления страниц только для чтения (exhibits.async_views).
+# Включайте при запуске под ASGI-сервером: под WSGI каждый такой запрос
+# выполняется через async_to_sync и только медленнее синхронного.
+EXHIBITS_ASYNC_VIEWS = False
 
 
 # Database
@@ -76,6 +91,80 @@ DATABASES = {
     }
 }
 
+# Профиль рабочего сервера (DATABASE_PROFILE=production).
+# WAL позволяет читать во время записи, а synchronous=NORMAL в режиме WAL
+# не теряет целостность базы, только последние транзакции при сбое питания.
+# busy_timeout заставляет ждать освобождения блокировки вместо немедленной
+# ошибки "database is locked". Транзакции начинаются с BEGIN IMMEDIATE:
+# в отложенной транзакции переход от чтения к записи при занятой базе
+# завершается ошибкой сразу, без ожидания.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ, а не в страницах.
+    'cache_size': -32 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+if os.environ.get('DATABASE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(
+                f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items()
+            ),
+        },
+    })
+
+# Реплики только для чтения: пути к копиям базы SQLite через запятую
+# в DATABASE_REPLICAS. Для другой СУБД добавьте псевдонимы реплик
+# в DATABASES и перечислите их в DATABASE_REPLICAS ниже. В тестах
+# реплики указывают на тестовую основную базу (MIRROR).
+for number, name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Приложения, страницы которых читают с реплик (exhibits.replicas).
+DATABASE_REPLICA_APPS = ['exhibits', 'users']
+# Сколько секунд после записи браузер читает только основную базу,
+# чтобы видеть свои изменения, пока реплика отстает.
+REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ['exhibits.replicas.ReplicaRouter'] if DATABASE_REPLICAS else []
+
+# Повторы транзакций записи, не дождавшихся блокировки базы
+# (exhibits.transactions.atomic_retry), и пауза перед первым повтором
+# в секундах; каждая следующая пауза вдвое длиннее.
+DATABASE_LOCK_RETRIES = 3
+DATABASE_LOCK_BACKOFF = 0.1
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Для нескольких процессов укажите общий бэкенд (Redis, Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'factory'),
+    }
+}
+
+# Время жизни закэшированных списков цехов и типов мебели, в секундах.
+# Списки сбрасываются сигналами при изменении данных, поэтому срок
+# ограничивает только расход памяти.
+EXHIBITS_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,6 +207,9 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Процессов для создания уменьшенных копий фотографий заказов.
+THUMBNAIL_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,93 @@
+// Подбор рабочих для записи журнала: флажки отмеченных рабочих
+// приходят со страницей, остальные рабочие выбранного цеха
+// подгружаются по мере поиска.
+(function () {
+  'use strict';
+
+  var DELAY = 250;
+
+  function option(container, id, name) {
+    var inputId = container.id + '_' + id;
+    var row = document.createElement('div');
+    var label = document.createElement('label');
+    var input = document.createElement('input');
+    label.htmlFor = inputId;
+    input.type = 'checkbox';
+    input.name = container.dataset.name;
+    input.value = id;
+    input.id = inputId;
+    label.appendChild(input);
+    label.appendChild(document.createTextNode(' ' + name));
+    row.appendChild(label);
+    return row;
+  }
+
+  function setup(select) {
+    var container = document.getElementById(select.id.replace(/workshop$/, 'workers'));
+    if (!container) {
+      return;
+    }
+    container.dataset.name = select.name.replace(/workshop$/, 'workers');
+
+    var search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control mb-2';
+    search.placeholder = 'Поиск по фамилии или имени';
+    container.parentNode.insertBefore(search, container);
+
+    var hint = document.createElement('small');
+    hint.className = 'text-muted';
+    container.parentNode.insertBefore(hint, container.nextSibling);
+
+    var timer = null;
+    var request = 0;
+
+    function load() {
+      // Отмеченные рабочие остаются, неотмеченные заменяются найденными.
+      var checked = {};
+      container.querySelectorAll('input[type=checkbox]').forEach(function (input) {
+        if (input.checked) {
+          checked[input.value] = true;
+        } else {
+          input.closest('div').remove();
+        }
+      });
+      if (!select.value) {
+        hint.textContent = 'Выберите цех, чтобы добавить рабочих.';
+        return;
+      }
+      var url = select.dataset.workersUrl +
+        '?workshop=' + encodeURIComponent(select.value) +
+        '&q=' + encodeURIComponent(search.value.trim());
+      var current = ++request;
+      fetch(url, {credentials: 'same-origin'})
+        .then(function (response) {
+          return response.json();
+        })
+        .then(function (data) {
+          if (current !== request) {
+            return;
+          }
+          data.results.forEach(function (worker) {
+            if (!checked[worker.id]) {
+              container.appendChild(option(container, worker.id, worker.name));
+            }
+          });
+          hint.textContent = data.more ?
+            'Показаны не все рабочие цеха - уточните поиск.' :
+            (data.results.length ? '' : 'Рабочие не найдены.');
+        });
+    }
+
+    select.addEventListener('change', load);
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(load, DELAY);
+    });
+    load();
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-workers-url]').forEach(setup);
+  });
+})();
@@ -1,9 +1,8 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.core.paginator import Paginator
-from django.db.models import Count
 from exhibits.models import Order
+from exhibits.views import get_order_page
 from .forms import CreationForm
 
 User = get_user_model()
@@ -24,19 +23,13 @@ def profile(request, username):
     
     # Администратор видит все заказы, остальные - только свои
     if request.user == user or request.user.is_superuser:
-        order_list = Order.objects.all().annotate(
-            workshop_count=Count('workshops')
-        )
+        order_list = Order.objects.all()
     else:
         order_list = Order.objects.filter(
             # Здесь можно добавить фильтрацию по заказам пользователя
-        ).annotate(
-            workshop_count=Count('workshops')
         )
     
-    paginator = Paginator(order_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_order_page(request, order_list)
     
     context = {
         'profile_user': user,